@@ -2,125 +2,135 @@
 # Engine 4: AI 8-K Filing Analyzer
 # Upgrade: Gemini 3.1 Pro + Supabase + Finnhub + Ticker
 # ============================================================
-import requests
-from bs4 import BeautifulSoup
-import time
-from datetime import datetime, timezone, timedelta
-import os, re, json
-from google import genai
-from google.genai import types
-
-from utils.supabase import supabase_insert, supabase_link_exists
+from functools import partial
+
+from utils.gemini import get_client, types
+from utils.edgar import fetch_filings
+from utils.feed import FeedCursor, drain, read_feed, log_alert_latency
+from utils.sec_parse import filing_ticker, parse_8k, unique_filings
+from utils import metrics, sec_index
+from utils.supabase import supabase_buffer, supabase_existing_links
 from utils.finnhub import get_stock_quote
 from utils.telegram import send_whale_telegram
 
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
-gemini_client = None
-if GEMINI_API_KEY:
-    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-    print("Gemini 3.1 Pro ready")
-
-
-def extract_ticker(txt):
-    m = re.search(r'<(?:issuerTradingSymbol|tradingSymbol)>\s*([^<]+?)\s*</', txt, re.IGNORECASE)
-    if m:
-        return m.group(1).strip().upper()
-    m = re.search(r'TICKER SYMBOL:\s*([^\n\r]+)', txt[:5000])
-    if m:
-        return m.group(1).strip().upper()
-    return "N/A"
+CURSOR = "8k"
+FIRST_RUN_MINUTES = 15
+# Stop at the first XBRL / graphic / archive document: the 8-K body and its EX-99.1 come before them
+FETCH_UNTIL = (b'<TYPE>GRAPHIC', b'<TYPE>EX-101', b'<TYPE>XML', b'<TYPE>ZIP', b'<TYPE>EXCEL', b'<TYPE>JSON')
+FETCH_MAX_BYTES = 1536 * 1024
+MAX_ALERTS_PER_RUN = 3
+
+
+def accepts(category):
+    return category.startswith('8-K')
+
+
+def ready():
+    """False without a Gemini client: radar then leaves the 8-K cursor out of the shared read."""
+    return bool(get_client())
+
+
+def process(entry, company, cik, content, client):
+    """Summarise one downloaded 8-K and alert on it; 1 if an alert went out, 0 if skipped."""
+    link = entry.link
+    ticker = filing_ticker(content)
+    if ticker == "N/A" and cik:
+        ticker = sec_index.ticker_for_cik(cik)
+
+    with metrics.stage("parse"):
+        form8k = parse_8k(content)
+    if form8k.is_administrative:
+        print(f"  Skipped (items {', '.join(form8k.items)} only): {company} ({ticker})")
+        metrics.count("skip.administrative")
+        supabase_buffer({
+            "source": "8k", "ticker": ticker, "company_name": company,
+            "action": "8-K", "ai_summary": "SKIP", "sentiment": "neutral", "sec_link": link
+        })
+        return 0
+    # Item sections + EX-99.1 when the parser finds them, else the raw head of the filing
+    body = form8k.prompt_text() or content[:15000]
+
+    price_str, change_str, cur_price, chg_pct = get_stock_quote(ticker)
+
+    prompt = (
+        "This is an excerpt (Item sections, press release) of a US SEC 8-K filing. Act as a professional Wall Street analyst.\n"
+        "Reply with exactly one word SKIP if any of these apply: "
+        "only XBRL tags, boilerplate headers, truncated/incomplete content with no event description, "
+        "routine debt admin (covenant updates, supplemental indentures, note listings), or no substantive financial/business event.\n"
+        "Otherwise summarize the key points in Traditional Chinese in 3-5 sentences. "
+        "Judge if bullish, bearish, or neutral. Use emoji: 🚀 bullish, 📉 bearish, 😐 neutral.\n\n"
+        f"Filing:\n{body}"
+    )
+    # An LLM failure propagates: the 8-K stays ahead of the cursor and is analysed next run
+    with metrics.stage("llm"):
+        ai_resp = client.models.generate_content(
+            model="gemini-3.1-pro-preview", contents=prompt,
+            config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=20000))
+        )
+    metrics.count_tokens(ai_resp)
+    summary = ai_resp.text.strip()
+    if summary.upper() == "SKIP":
+        print(f"  Skipped (no content): {company} ({ticker})")
+        metrics.count("skip.llm")
+        supabase_buffer({
+            "source": "8k", "ticker": ticker, "company_name": company,
+            "action": "8-K", "price": cur_price, "change_pct": chg_pct,
+            "ai_summary": "SKIP", "sentiment": "neutral", "sec_link": link
+        })
+        return 0
+    sentiment = "bullish" if "🚀" in summary else ("bearish" if "📉" in summary else "neutral")
+
+    msg = "🤖 <b>【AI 8-K 財報秒讀機】</b>\n"
+    msg += f"🏢 公司: <b>{company} ({ticker})</b>\n"
+    if ticker != "N/A":
+        msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
+    msg += f"📝 <b>AI 總結:</b>\n{summary}\n\n"
+    msg += f"🔗 <a href='{link}'>查看 8-K 原文</a>"
+
+    send_whale_telegram(msg, on_sent=partial(log_alert_latency, entry))
+    print(f"  Sent: {company} ({ticker})")
+    supabase_buffer({
+        "source": "8k", "ticker": ticker, "company_name": company,
+        "action": "8-K", "price": cur_price, "change_pct": chg_pct,
+        "ai_summary": summary, "sentiment": sentiment, "sec_link": link
+    })
+    return 1
+
+
+def handle(new_entries, cursor):
+    """Run the 8-K pipeline over new feed entries and advance `cursor` past them."""
+    print(f"Found {len(new_entries)} new 8-K entries")
+
+    # Without Gemini nothing can be analysed: leave the cursor where it is for the next run
+    client = get_client()
+    if not client:
+        print("⚠️ Gemini client unavailable; 8-K entries left for the next run")
+        return 0
+
+    window = unique_filings(new_entries, prefer_role='Filer')
+
+    existing = supabase_existing_links(e.link for e in window)
+    pending = [e for e in window if e.link not in existing]
+    metrics.count("skip.dedup", len(window) - len(pending))
+
+    # Primary document + press release only; XBRL and uuencoded graphics are never downloaded
+    filings = fetch_filings((e.link for e in pending), until=FETCH_UNTIL, max_bytes=FETCH_MAX_BYTES)
+
+    # A failed download or Gemini call is retried next run without holding back the filings after it
+    def run(entry):
+        content = filings.get(entry.link)
+        if content is None:
+            return None
+        return process(entry, entry.company, entry.cik if entry.role == 'Filer' else None, content, client)
+
+    return drain(cursor, new_entries, pending, run, MAX_ALERTS_PER_RUN)
 
 
 def main():
-    hdrs = {'User-Agent': 'WhaleRadarBot Admin@kuafuorhk.com'}
-    now_utc = datetime.now(timezone.utc)
-    time_limit = now_utc - timedelta(minutes=15)
-
-    resp = requests.get(
-        'https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=8-K&owner=include&count=40&output=atom',
-        headers=hdrs
-    )
-    soup = BeautifulSoup(resp.content, 'xml')
-    entries = soup.find_all('entry')
-    print(f"Found {len(entries)} 8-K entries")
-    found = 0
-
-    for entry in entries:
-        try:
-            if datetime.fromisoformat(entry.updated.text.replace('Z', '+00:00')).astimezone(timezone.utc) < time_limit:
-                break
-        except Exception:
-            continue
-
-        link = entry.link['href']
-        if supabase_link_exists(link):
-            continue
-        if not gemini_client:
-            break
-
-        # SEC title format: "8-K - Company Name (CIK) (Filer)"
-        raw_title = entry.title.text if entry.title else ""
-        parts = raw_title.split(' - ', 1)
-        if len(parts) > 1:
-            company = re.sub(r'\s*\(\d+\)\s*\(.*?\)\s*$', '', parts[1]).strip()
-        else:
-            company = raw_title.strip() or "Unknown"
-        txt_resp = requests.get(link.replace('-index.htm', '.txt'), headers=hdrs)
-
-        if txt_resp.status_code != 200:
-            continue
-
-        content = txt_resp.text
-        ticker = extract_ticker(content)
-        price_str, change_str, cur_price, chg_pct = get_stock_quote(ticker)
-
-        prompt = (
-            "This is a partial US SEC 8-K filing. Act as a professional Wall Street analyst.\n"
-            "Reply with exactly one word SKIP if any of these apply: "
-            "only XBRL tags, boilerplate headers, truncated/incomplete content with no event description, "
-            "routine debt admin (covenant updates, supplemental indentures, note listings), or no substantive financial/business event.\n"
-            "Otherwise summarize the key points in Traditional Chinese in 3-5 sentences. "
-            "Judge if bullish, bearish, or neutral. Use emoji: 🚀 bullish, 📉 bearish, 😐 neutral.\n\n"
-            f"Filing:\n{content[:15000]}"
-        )
-        try:
-            ai_resp = gemini_client.models.generate_content(
-                model="gemini-3.1-pro-preview", contents=prompt,
-                config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=20000))
-            )
-            summary = ai_resp.text.strip()
-            if summary.upper() == "SKIP":
-                print(f"  Skipped (no content): {company} ({ticker})")
-                supabase_insert({
-                    "source": "8k", "ticker": ticker, "company_name": company,
-                    "action": "8-K", "price": cur_price, "change_pct": chg_pct,
-                    "ai_summary": "SKIP", "sentiment": "neutral", "sec_link": link
-                })
-                continue
-            sentiment = "bullish" if "🚀" in summary else ("bearish" if "📉" in summary else "neutral")
-
-            msg = "🤖 <b>【AI 8-K 財報秒讀機】</b>\n"
-            msg += f"🏢 公司: <b>{company} ({ticker})</b>\n"
-            if ticker != "N/A":
-                msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
-            msg += f"📝 <b>AI 總結:</b>\n{summary}\n\n"
-            msg += f"🔗 <a href='{link}'>查看 8-K 原文</a>"
-
-            send_whale_telegram(msg)
-            print(f"  Sent: {company} ({ticker})")
-            supabase_insert({
-                "source": "8k", "ticker": ticker, "company_name": company,
-                "action": "8-K", "price": cur_price, "change_pct": chg_pct,
-                "ai_summary": summary, "sentiment": sentiment, "sec_link": link
-            })
-            found += 1
-            time.sleep(2)
-        except Exception as e:
-            print(f"AI error: {e}")
-
-        if found >= 3:
-            break
+    with metrics.run(CURSOR):
+        cursor = FeedCursor.load(CURSOR)
+        return handle(read_feed('8-K', 'include', cursor, FIRST_RUN_MINUTES), cursor)
 
 
 if __name__ == "__main__":
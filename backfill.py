@@ -0,0 +1,229 @@
+# ==================== backfill.py ====================
+# Rebuild whale_alerts history from the EDGAR daily indexes
+# Usage: python backfill.py 2026-10-14 [2026-10-16] [--engines form4,sc13,8k] [--dry-run]
+# Reads master.{date}.idx, fetches the selected filings through the
+# rate-limited SEC client, parses them in a process pool and bulk-inserts
+# the rows. No Telegram, no Gemini: backfilled rows carry the filing's
+# EDGAR acceptance time as created_at and "backfill": true in extra_data.
+# Without the AI screen a Form 144 / 8-K is not an alert: those rows get
+# a neutral "（回填）" action that the secretary's alert views exclude.
+# =====================================================
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from utils import sec_index
+from utils.edgar import sec_get, fetch_filings
+from utils.finnhub import get_company_profile, get_profiles
+from utils.sec_parse import (acceptance_time, filing_ticker, header_party, parse_8k, parse_form4, parse_form144,
+                             parse_schedule13)
+from utils.supabase import AlertBuffer, supabase_existing_links
+from utils.watchlist import load_sp500
+import whale
+import form144
+import institutional
+import ai_analyst
+
+DAILY_INDEX_URL = 'https://www.sec.gov/Archives/edgar/daily-index/{year}/QTR{quarter}/master.{ymd}.idx'
+ARCHIVE_LINK = 'https://www.sec.gov/Archives/edgar/data/{cik}/{folder}/{accession}-index.htm'
+
+ENGINES = {
+    "form4": whale,
+    "form144": form144,
+    "sc13": institutional,
+    "8k": ai_analyst,
+}
+# Engines whose live pipeline only alerts on S&P 500 issuers (Form 144 gates on market cap instead)
+WATCHLIST_ENGINES = {"form4"}
+# Every 8-K on EDGAR is hundreds a day with no summary to show: only on explicit --engines
+DEFAULT_ENGINES = ["form4", "form144", "sc13"]
+# Neutral actions for rows the live pipeline would only alert on after the AI screen
+BACKFILL_ACTION = {"form144": "Form 144（回填）", "8k": "8-K（回填）"}
+
+
+def read_master_index(day):
+    """[(cik, company, form_type, accession)] from one day's master.idx; [] for weekends/holidays."""
+    url = DAILY_INDEX_URL.format(year=day.year, quarter=(day.month - 1) // 3 + 1, ymd=day.strftime('%Y%m%d'))
+    resp = sec_get(url)
+    if resp.status_code != 200:
+        print(f"  {day}: no daily index ({resp.status_code})")
+        return []
+    rows = []
+    body = resp.content.decode('latin-1')
+    for line in body.split('\n-----', 1)[-1].splitlines():
+        parts = line.split('|')
+        if len(parts) != 5 or not parts[0].strip().isdigit():
+            continue
+        m = re.search(r'\d{10}-\d{2}-\d{6}', parts[4])
+        if m:
+            rows.append((int(parts[0]), parts[1].strip(), parts[2].strip(), m.group(0)))
+    return rows
+
+
+def select_filings(rows, engines, sp500):
+    """{accession: (engine, form_type, [party ciks])} for the forms the engines handle.
+    The index lists a filing once per party, like the feed."""
+    selected = {}
+    for cik, _, form_type, accession in rows:
+        if accession in selected:
+            selected[accession][2].append(cik)
+            continue
+        for name in engines:
+            if ENGINES[name].accepts(form_type):
+                selected[accession] = (name, form_type, [cik])
+                break
+    if sp500.ciks:
+        selected = {
+            acc: v for acc, v in selected.items()
+            if v[0] not in WATCHLIST_ENGINES or any(sp500.has_cik(c) for c in v[2])
+        }
+    return selected
+
+
+def archive_link(cik, accession):
+    """Filing index link in the same form the getcurrent feed uses, so sec_link dedups against live rows."""
+    return ARCHIVE_LINK.format(cik=int(cik), folder=accession.replace('-', ''), accession=accession)
+
+
+def parse_filing(job):
+    """Pure, picklable parse step run in the process pool: (engine, form_type, txt) ->
+    {"row", "cik", "name"} or None. `cik` is the party whose folder the live feed links to."""
+    engine, form_type, txt = job
+    try:
+        if engine == "form4":
+            f = parse_form4(txt)
+            if f is None:
+                return None
+            trades = f.open_market_trades
+            if not any(t.total_value >= whale.MIN_WHALE_AMOUNT for t in trades):
+                return None
+            last = trades[-1]
+            row = {
+                "source": "form4", "ticker": f.ticker, "company_name": f.issuer_name,
+                "action": whale.ACTION_LABEL[last.code],
+                "reporter_name": f.reporter_name, "shares": last.shares, "total_value": last.total_value,
+                "extra_data": json.dumps({"tx_price": last.price, "backfill": True}),
+            }
+            cik, name = f.issuer_cik, f.issuer_name
+        elif engine == "form144":
+            f = parse_form144(txt)
+            row = {
+                "source": "form144", "ticker": f.ticker, "company_name": f.issuer_name,
+                "action": BACKFILL_ACTION["form144"],
+                "extra_data": json.dumps({"backfill": True}),
+            }
+            cik, name = f.issuer_cik, f.issuer_name
+        elif engine == "sc13":
+            f = parse_schedule13(txt)
+            row = {
+                "source": "sc13", "ticker": "N/A", "company_name": f.subject_name,
+                "action": form_type, "reporter_name": f.filer_name,
+                "extra_data": json.dumps({"intent": "activist" if form_type.startswith('SC 13D') else "passive",
+                                          "backfill": True}),
+            }
+            cik, name = f.subject_cik, f.subject_name
+        else:
+            # Same administrative gate as the live engine (exhibit-only 8-Ks are never analysed)
+            if parse_8k(txt).is_administrative:
+                return None
+            name, cik = header_party(txt, 'FILER')
+            row = {
+                "source": "8k", "ticker": filing_ticker(txt), "company_name": name or "Unknown",
+                "action": BACKFILL_ACTION["8k"], "extra_data": json.dumps({"backfill": True}),
+            }
+        accepted = acceptance_time(txt)
+        if accepted:
+            row["created_at"] = accepted.isoformat()
+        return {"row": row, "cik": cik, "name": name}
+    except Exception as e:
+        print(f"  Parse error: {e}")
+        return None
+
+
+def backfill_day(day, engines, sp500, pool, alerts=None):
+    selected = select_filings(read_master_index(day), engines, sp500)
+    if not selected:
+        return 0
+    print(f"📚 {day}: {len(selected)} filings selected")
+
+    jobs, accessions = [], []
+    for name in engines:
+        group = {acc: v for acc, v in selected.items() if v[0] == name}
+        links = {archive_link(v[2][0], acc): acc for acc, v in group.items()}
+        engine = ENGINES[name]
+        texts = fetch_filings(links, until=engine.FETCH_UNTIL, max_bytes=engine.FETCH_MAX_BYTES)
+        for link, txt in texts.items():
+            if txt is not None:
+                acc = links[link]
+                jobs.append((name, group[acc][1], txt))
+                accessions.append(acc)
+
+    rows = []
+    for acc, parsed in zip(accessions, pool.map(parse_filing, jobs, chunksize=16)):
+        if parsed is None:
+            continue
+        row = parsed["row"]
+        if row["ticker"] in ("N/A", "NONE") and parsed["cik"]:
+            row["ticker"] = sec_index.ticker_for_cik(parsed["cik"])
+        if row["ticker"] == "N/A" and parsed["name"]:
+            row["ticker"] = sec_index.ticker_for_name(parsed["name"])
+        if row["source"] in WATCHLIST_ENGINES and sp500 and not sp500.has_ticker(row["ticker"]):
+            continue
+        row["sec_link"] = archive_link(parsed["cik"] or selected[acc][2][0], acc)
+        rows.append(row)
+
+    # Same market-cap gate as the live Form 144 pipeline; profiles are fetched concurrently once
+    # and then served from the disk cache
+    get_profiles(r["ticker"] for r in rows if r["source"] == "form144")
+    rows = [r for r in rows if r["source"] != "form144"
+            or get_company_profile(r["ticker"])["marketCap"] >= form144.MIN_MARKET_CAP]
+
+    existing = supabase_existing_links(r["sec_link"] for r in rows)
+    rows = [r for r in rows if r["sec_link"] not in existing]
+    if alerts is None:
+        print(f"  {day}: {len(rows)} rows (dry run, nothing written)")
+        return len(rows)
+    for row in rows:
+        alerts.add(row)
+    print(f"  {day}: {len(rows)} rows queued")
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill whale_alerts from EDGAR daily indexes")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat, nargs="?")
+    parser.add_argument("--engines", default=",".join(DEFAULT_ENGINES),
+                        help="comma-separated subset of " + ", ".join(ENGINES) + " (default: all but 8k)")
+    parser.add_argument("--dry-run", action="store_true", help="parse and count, but don't write to Supabase")
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        raise SystemExit(f"Unknown engine(s): {', '.join(unknown)} (choose from {', '.join(ENGINES)})")
+
+    sec_index.load()
+    sp500 = load_sp500()
+    total = 0
+    # Rows from many days share 500-row array inserts instead of a few small ones per day
+    alerts = None if args.dry_run else AlertBuffer(max_rows=500, max_age=None)
+    day = args.start
+    end = args.end or args.start
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        while day <= end:
+            if day.weekday() < 5:
+                total += backfill_day(day, engines, sp500, pool, alerts)
+            day += timedelta(days=1)
+    if alerts is not None:
+        alerts.flush()
+        print(f"✅ Backfill done: {alerts.written}/{total} rows written")
+    else:
+        print(f"✅ Backfill done: {total} rows")
+
+
+if __name__ == "__main__":
+    main()
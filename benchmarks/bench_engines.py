@@ -0,0 +1,172 @@
+"""Offline parser benchmark: the extraction step of every engine on the recorded EDGAR filings.
+
+Runs the same pure functions the engines call between "filing downloaded" and "alert decided"
+(no network, no Supabase, no LLM) over benchmarks/fixtures, and reports per case:
+
+    atom     combined getcurrent feed -> parse_atom + unique_filings + FeedEntry.company
+    form4    whale.py   -> parse_form4 + open_market_trades / MIN_WHALE_AMOUNT gate
+    form144  form144.py -> parse_form144 (XML / SEC header / feed title cascade)
+    sc13     institutional.py -> parse_schedule13 (.txt and .hdr.sgml headers)
+    8k       ai_analyst.py -> filing_ticker + parse_8k + prompt_text
+
+filings/second (best of --rounds) and the tracemalloc peak of one pass. The numbers are checked
+against benchmarks/baseline.json: the run fails when a case drops below baseline throughput by
+more than --tolerance, or its peak memory grows past --max-memory x baseline. Baselines are
+machine-specific; refresh them with --update-baseline after an intended change.
+
+    python benchmarks/bench_engines.py [--repeat N] [--rounds N] [--tolerance 0.5] [--update-baseline]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.sec_parse import (acceptance_time, filing_ticker, parse_8k, parse_atom, parse_form144,
+                             parse_form4, parse_schedule13, unique_filings)
+from whale import MIN_WHALE_AMOUNT
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+# Peaks of a few KB move with the interpreter version: ignore growth below this
+MEMORY_SLACK = 32 * 1024
+
+
+def load_fixtures(pattern, binary=False):
+    out = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, pattern))):
+        with open(path, 'rb' if binary else 'r', encoding=None if binary else 'utf-8') as f:
+            out.append(f.read())
+    return out
+
+
+# ---- One function per engine: what it extracts from a single downloaded document ----
+
+def extract_atom(content):
+    entries = parse_atom(content)
+    return [(e.accession, e.category, e.company) for e in unique_filings(entries, prefer_role='Subject')]
+
+
+def extract_form4(txt):
+    form4 = parse_form4(txt)
+    whales = [t for t in form4.open_market_trades if t.total_value >= MIN_WHALE_AMOUNT]
+    return form4.ticker, [(t.code, t.intent, t.total_value) for t in whales], acceptance_time(txt)
+
+
+def extract_form144(txt):
+    return parse_form144(txt), acceptance_time(txt)
+
+
+def extract_sc13(txt):
+    return parse_schedule13(txt), acceptance_time(txt)
+
+
+def extract_8k(txt):
+    form8k = parse_8k(txt)
+    prompt = "" if form8k.is_administrative else form8k.prompt_text()
+    return filing_ticker(txt), list(form8k.items), len(prompt), acceptance_time(txt)
+
+
+CASES = [
+    ("atom", 'feeds/*.atom', True, extract_atom),
+    ("form4", 'form4/*.txt', False, extract_form4),
+    ("form144", 'form144/*.txt', False, extract_form144),
+    ("sc13", 'sc13/*', False, extract_sc13),
+    ("8k", '8k/*.txt', False, extract_8k),
+]
+
+
+def throughput(fn, docs, repeat, rounds):
+    """Best filings/second over `rounds` timed loops of `repeat` passes."""
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for d in docs:
+                fn(d)
+        best = max(best, repeat * len(docs) / (time.perf_counter() - start))
+    return best
+
+
+def peak_memory(fn, docs):
+    """tracemalloc peak (bytes) of one pass over `docs`, inputs excluded."""
+    tracemalloc.start()
+    try:
+        for d in docs:
+            fn(d)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline engine parser benchmark on recorded EDGAR fixtures")
+    ap.add_argument('--repeat', type=int, default=50, help="passes over the fixtures per timed round")
+    ap.add_argument('--rounds', type=int, default=3)
+    ap.add_argument('--tolerance', type=float, default=0.5,
+                    help="fail when filings/s falls below baseline x (1 - tolerance)")
+    ap.add_argument('--max-memory', type=float, default=2.0,
+                    help="fail when peak memory exceeds baseline x this factor")
+    ap.add_argument('--baseline', default=BASELINE_FILE)
+    ap.add_argument('--update-baseline', action='store_true')
+    ap.add_argument('--case', action='append', help="only these cases (repeatable)")
+    args = ap.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results, failures = {}, []
+    print(f"{'case':<10}{'docs':>6}{'filings/s':>12}{'baseline':>12}{'peak KB':>10}{'baseline':>10}")
+    for name, pattern, binary, fn in CASES:
+        if args.case and name not in args.case:
+            continue
+        docs = load_fixtures(pattern, binary)
+        if not docs:
+            failures.append(f"{name}: no fixtures match {pattern}")
+            continue
+        for d in docs:
+            fn(d)  # warm up regex / lxml caches outside the measurement
+        rate = throughput(fn, docs, args.repeat, args.rounds)
+        peak = peak_memory(fn, docs)
+        results[name] = {"docs": len(docs), "filings_per_sec": round(rate, 1), "peak_bytes": peak}
+
+        base = baseline.get(name, {})
+        base_rate, base_peak = base.get("filings_per_sec"), base.get("peak_bytes")
+        print(f"{name:<10}{len(docs):>6}{rate:>12,.0f}{(f'{base_rate:,.0f}' if base_rate else '-'):>12}"
+              f"{peak / 1024:>10,.0f}{(f'{base_peak / 1024:,.0f}' if base_peak else '-'):>10}")
+        if args.update_baseline:
+            continue
+        if base_rate and rate < base_rate * (1 - args.tolerance):
+            failures.append(f"{name}: {rate:,.0f} filings/s < {1 - args.tolerance:.0%} of baseline {base_rate:,.0f}")
+        if base_peak and peak > max(base_peak * args.max_memory, base_peak + MEMORY_SLACK):
+            failures.append(f"{name}: peak {peak / 1024:,.0f}KB > {args.max_memory:g}x baseline {base_peak / 1024:,.0f}KB")
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✅ Baseline written to {os.path.relpath(args.baseline, ROOT)}")
+        return 0
+    if failures:
+        print("❌ Parser regression:")
+        for msg in failures:
+            print(f"   {msg}")
+        return 1
+    print("✅ All cases within baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
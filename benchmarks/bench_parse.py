@@ -0,0 +1,99 @@
+"""Feed + Form 4 parsing benchmark: BeautifulSoup (pre-lxml engine code) vs utils.sec_parse.
+
+Runs on the recorded filings in benchmarks/fixtures, checks both paths extract the same
+fields, and prints filings/second for each.
+
+    python benchmarks/bench_parse.py [--repeat N]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from utils.sec_parse import parse_atom, parse_form4
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures(pattern):
+    out = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, pattern))):
+        with open(path, 'rb') as f:
+            out.append(f.read())
+    return out
+
+
+# ---- Legacy path: what whale.py did per feed / per filing before utils.sec_parse ----
+
+def legacy_atom(content):
+    soup = BeautifulSoup(content, 'xml')
+    return [(e.link['href'], e.updated.text, e.title.text) for e in soup.find_all('entry')]
+
+
+def legacy_form4(content):
+    xml_soup = BeautifulSoup(content, 'xml')
+    issuer_name = xml_soup.find('issuerName').text if xml_soup.find('issuerName') else "Unknown"
+    reporter_name = xml_soup.find('rptOwnerName').text if xml_soup.find('rptOwnerName') else "Unknown"
+    ticker_tag = xml_soup.find('issuerTradingSymbol')
+    ticker = ticker_tag.text.strip().upper() if ticker_tag else "N/A"
+    txns = []
+    for txn in xml_soup.find_all('nonDerivativeTransaction'):
+        coding_tag = txn.find('transactionCoding')
+        tx_code = coding_tag.find('transactionCode').text if coding_tag and coding_tag.find('transactionCode') else ""
+        shares_tag = txn.find('transactionShares')
+        shares_str = shares_tag.find('value').text if shares_tag and shares_tag.find('value') else "0"
+        price_tag = txn.find('transactionPricePerShare')
+        price_val_str = price_tag.find('value').text if price_tag and price_tag.find('value') else "0"
+        post_tag = txn.find('sharesOwnedFollowingTransaction')
+        post_str = post_tag.find('value').text if post_tag and post_tag.find('value') else "-1"
+        txns.append((tx_code, float(shares_str), float(price_val_str), float(post_str)))
+    return issuer_name.strip(), reporter_name.strip(), ticker, txns
+
+
+def fast_atom(content):
+    return [(e.link, e.updated, e.title) for e in parse_atom(content)]
+
+
+def fast_form4(content):
+    f = parse_form4(content)
+    return f.issuer_name, f.reporter_name, f.ticker, [(t.code, t.shares, t.price, t.shares_after) for t in f.transactions]
+
+
+def bench(fn, docs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for d in docs:
+            fn(d)
+    elapsed = time.perf_counter() - start
+    return repeat * len(docs) / elapsed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=200)
+    args = ap.parse_args(argv)
+
+    feeds = load_fixtures('feeds/*.atom')
+    form4s = load_fixtures('form4/*.txt')
+
+    for d in form4s:
+        assert legacy_form4(d) == fast_form4(d), "lxml Form 4 parse disagrees with the BeautifulSoup path"
+    for d in feeds:
+        assert len(legacy_atom(d)) == len(fast_atom(d))
+
+    print(f"{'case':<12}{'bs4 /s':>12}{'lxml /s':>12}{'speedup':>10}")
+    for name, docs, slow, fast in [
+        ("atom feed", feeds, legacy_atom, fast_atom),
+        ("form 4", form4s, legacy_form4, fast_form4),
+    ]:
+        a, b = bench(slow, docs, args.repeat), bench(fast, docs, args.repeat)
+        print(f"{name:<12}{a:>12,.0f}{b:>12,.0f}{b / a:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
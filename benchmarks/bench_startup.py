@@ -0,0 +1,67 @@
+"""Cold-start benchmark: import time of each entry point, measured with `python -X importtime`.
+
+Each module is imported in a fresh interpreter (best of --repeat runs). Also checks that the
+heavy dependencies (pandas, yfinance, mplfinance, google.genai) stay deferred until first use,
+and exits non-zero when a module leaks one of them or exceeds --max-ms.
+
+    python benchmarks/bench_startup.py [--repeat N] [--max-ms MS] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['radar', 'whale', 'form144', 'institutional', 'ai_analyst', 'daily_report']
+# Must only be imported when a chart is drawn or the LLM is called
+DEFERRED = ['pandas', 'yfinance', 'mplfinance', 'google.genai']
+
+
+def import_profile(module):
+    """{imported module: (self us, cumulative us)} for `import module` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    env.pop('GEMINI_API_KEY', None)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--max-ms', type=float, default=None, help='fail when any module imports slower than this')
+    ap.add_argument('--top', type=int, default=5, help='heaviest imports to list per module')
+    args = ap.parse_args(argv)
+
+    failures = []
+    print(f"{'module':<14}{'import ms':>12}  deferred deps loaded")
+    for module in MODULES:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda p: p[module][1])
+        ms = best[module][1] / 1000
+        leaked = [d for d in DEFERRED if d in best]
+        print(f"{module:<14}{ms:>12.1f}  {', '.join(leaked) or '-'}")
+        heaviest = sorted(((cum, name) for name, (_, cum) in best.items() if name != module), reverse=True)
+        for cum, name in heaviest[:args.top]:
+            print(f"{'':<16}{cum / 1000:>8.1f}  {name}")
+        if leaked:
+            failures.append(f"{module} imports {', '.join(leaked)} at startup")
+        if args.max_ms is not None and ms > args.max_ms:
+            failures.append(f"{module} import took {ms:.1f} ms (> {args.max_ms} ms)")
+
+    for f in failures:
+        print(f"❌ {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,26 +5,19 @@
 # =============================================================
 import requests
 from datetime import datetime, timezone, timedelta
-import os, json, uuid, time
-from google import genai
-from google.genai import types
+import os, json, uuid
+
+from utils.gemini import get_client, types
+from utils.finnhub import get_quotes, get_profiles
+from utils import postgrest
 
 BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN_PRIVATE') or os.environ.get('TELEGRAM_BOT_TOKEN')
 CHAT_ID_PRIVATE = os.environ.get('TELEGRAM_CHAT_ID_PRIVATE')
-FINNHUB_API_KEY = os.environ.get('FINNHUB_API_KEY')
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-SUPABASE_URL = os.environ.get('SUPABASE_URL')
-SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
 ETORO_USER_KEY = os.environ.get('ETORO_USER_KEY')
 ETORO_API_KEY = os.environ.get('ETORO_API_KEY', '')
 
 ETORO_BASE = "https://public-api.etoro.com/api/v1"
 
-gemini_client = None
-if GEMINI_API_KEY:
-    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-
-
 def etoro_headers():
     return {
         "x-request-id": str(uuid.uuid4()),
@@ -60,12 +53,11 @@ def etoro_get_positions():
 
 
 def get_supabase_holdings():
-    if not SUPABASE_URL or not SUPABASE_KEY:
+    db = postgrest.get_client()
+    if not db:
         return []
     try:
-        h = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-        r = requests.get(f"{SUPABASE_URL}/rest/v1/portfolio_holdings", headers=h,
-                         params={"active": "eq.true", "order": "ticker"})
+        r = db.select("portfolio_holdings", {"active": "eq.true", "order": "ticker"})
         if r.status_code == 200:
             return r.json()
     except Exception as e:
@@ -73,30 +65,6 @@ def get_supabase_holdings():
     return []
 
 
-def get_quote(ticker):
-    if not FINNHUB_API_KEY:
-        return {}
-    try:
-        r = requests.get(f"https://finnhub.io/api/v1/quote?symbol={ticker}&token={FINNHUB_API_KEY}")
-        if r.status_code == 200:
-            return r.json()
-    except Exception as e:
-        print(f"Finnhub quote error: {e}")
-    return {}
-
-
-def get_profile(ticker):
-    if not FINNHUB_API_KEY:
-        return {}
-    try:
-        r = requests.get(f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker}&token={FINNHUB_API_KEY}")
-        if r.status_code == 200:
-            return r.json()
-    except Exception as e:
-        print(f"Finnhub profile error: {e}")
-    return {}
-
-
 def send_private(msg):
     if not CHAT_ID_PRIVATE:
         print("No CHAT_ID_PRIVATE set, printing:")
@@ -170,10 +138,11 @@ def main():
     portfolio_data = []
     total_value = total_cost = total_day_pnl = 0
 
+    quotes = get_quotes(positions)
+    profiles = get_profiles(positions)
     for t, pos in positions.items():
-        quote = get_quote(t)
-        profile = get_profile(t)
-        time.sleep(0.3)
+        quote = quotes.get(t, {})
+        profile = profiles.get(t, {})
 
         price = quote.get('c', 0)
         prev_close = quote.get('pc', 0)
@@ -225,6 +194,7 @@ def main():
     msg += f"───────────────\n"
 
     # AI: Hayek (CFO)
+    gemini_client = get_client()
     if gemini_client:
         portfolio_summary = "\n".join([
             f"{p['ticker']}: ${p['price']:.2f}, 今日{p['day_change_pct']:+.1f}%, 成本${p['avg_cost']:.2f}, P/L{p['pnl_pct']:+.1f}%, {p['sector']}"
@@ -2,26 +2,23 @@
 # Engine 2: Form 144 Insider Selling Alert
 # Sector + AI upgrade
 # =========================================================
-import requests
-from bs4 import BeautifulSoup
-import time
-from datetime import datetime, timezone, timedelta
-import os, re, json
-from google import genai
-from google.genai import types
-
-from utils.supabase import supabase_insert, supabase_link_exists, supabase_patch, supabase_ticker_recent
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from utils.gemini import get_client, types
+from utils.edgar import fetch_filings
+from utils.feed import FeedCursor, drain, read_feed, log_alert_latency
+from utils.sec_parse import UNKNOWN_ISSUER, parse_form144, unique_filings
+from utils import metrics, sec_index
+from utils.supabase import supabase_buffer, supabase_claim, supabase_existing_links, supabase_recent_tickers
 from utils.finnhub import get_stock_quote, get_company_profile
 from utils.telegram import send_whale_telegram
 
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-
-gemini_client = None
-if GEMINI_API_KEY:
-    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-    print("Gemini 3.1 Pro engine ready")
-
-SEC_HEADERS = {'User-Agent': 'WhaleRadarBot Admin@kuafuorhk.com'}
+CURSOR = "form144"
+FIRST_RUN_MINUTES = 30
+FETCH_UNTIL = b'</XML>'
+FETCH_MAX_BYTES = 512 * 1024
 
 SECTOR_EMOJI = {
     "Technology": "💻", "Healthcare": "🏥", "Financial Services": "🏦",
@@ -38,199 +35,211 @@ def get_sector_emoji(sector):
     return "📈"
 
 
-def get_sec_ticker_map():
-    try:
-        resp = requests.get("https://www.sec.gov/files/company_tickers.json", headers=SEC_HEADERS)
-        return {str(v['cik_str']): v['ticker'] for v in resp.json().values()}
-    except Exception as e:
-        print(f"⚠️ SEC ticker map failed: {e}")
-        return {}
-
-
-def ai_is_routine_selling(company_name, ticker):
-    """AI pre-screen: return True if this is routine selling (tax/vesting), skip it"""
-    if not gemini_client:
-        return False
-    try:
-        prompt = (
-            f"Company: {company_name} ({ticker}) filed Form 144 with SEC.\n"
-            f"Search latest news. Is this most likely ROUTINE selling "
-            f"(restricted stock vesting, tax withholding, 10b5-1 plan, scheduled sale)?\n"
-            f"Reply ONLY 'ROUTINE' or 'NOT_ROUTINE'. One word only."
-        )
-        resp = gemini_client.models.generate_content(
-            model="gemini-3.1-pro-preview", contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-                http_options=types.HttpOptions(timeout=20000),
-            ))
-        answer = resp.text.strip().upper()
-        is_routine = "ROUTINE" in answer and "NOT" not in answer
-        print(f"    AI pre-screen: {answer} -> {'SKIP' if is_routine else 'ALERT'}")
-        return is_routine
-    except Exception as e:
-        print(f"    AI pre-screen error: {e}")
-        return False
+AI_CONCURRENCY = 5
+MAX_ALERTS_PER_RUN = 5
+MIN_MARKET_CAP = 5000  # $M
+# Marks a filing whose download or parse failed in phase 1
+FAILED = object()
+# One alert per ticker per hour however many insiders file; enforced again atomically on insert
+COOLDOWN_MINUTES = 60
+AI_FALLBACK = {"routine": False, "risk": "unknown", "analysis": "⚠️ 有內部人士已提交拋售意向書"}
+RISK_LABEL = {"high": "🔴高風險", "medium": "🟡中風險", "low": "🟢低風險"}
+
+# One grounded call returns the pre-screen verdict and the alert text together
+SCREEN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "routine": {"type": "boolean",
+                    "description": "True if most likely routine selling: RSU vesting, tax withholding, 10b5-1 plan, scheduled sale"},
+        "risk": {"type": "string", "enum": ["high", "medium", "low"]},
+        "analysis": {"type": "string", "description": "繁體中文，80字內"},
+    },
+    "required": ["routine", "risk", "analysis"],
+}
 
 
-def ai_explain_selling(company_name, ticker, sector, market_cap_m):
-    if not gemini_client:
-        return "⚠️ 有內部人士已提交拋售意向書"
+def ai_screen_selling(client, company_name, ticker, sector, market_cap_m):
+    """Routine pre-screen + risk + short analysis in one structured Gemini call."""
     try:
         mc = f"市值：${market_cap_m/1000:.1f}B。" if market_cap_m >= 1000 else ""
         prompt = (
             f"公司：{company_name} ({ticker})，板塊：{sector}。{mc}\n"
-            f"內部人士向 SEC 提交 Form 144 拋售意向書。\n\n"
-            f"請用繁體中文，80字內，簡潔分析：\n"
-            f"1. {sector} 板塊趨勢（看多或看空，一句）\n"
-            f"2. 拋售原因（搜尋新聞）\n"
-            f"3. 風險判斷\n\n"
-            f"結尾：🔴高風險 / 🟡中風險 / 🟢低風險\n"
-            f"禁 markdown。禁廢話。Bloomberg 風格。"
+            f"內部人士向 SEC 提交 Form 144 拋售意向書。搜尋最新新聞。\n\n"
+            f"routine：是否最可能為常規拋售（限制性股票歸屬、預扣稅、10b5-1 計劃、既定出售）。\n"
+            f"risk：風險判斷 high / medium / low。\n"
+            f"analysis：繁體中文，80字內，簡潔分析 1. {sector} 板塊趨勢（看多或看空，一句）"
+            f" 2. 拋售原因 3. 風險判斷。禁 markdown。禁廢話。Bloomberg 風格。"
         )
-        resp = gemini_client.models.generate_content(
-            model="gemini-3.1-pro-preview", contents=prompt,
-            config=types.GenerateContentConfig(
-                http_options=types.HttpOptions(timeout=20000),
-            ))
-        return resp.text.strip()
+        with metrics.stage("llm"):
+            resp = client.models.generate_content(
+                model="gemini-3.1-pro-preview", contents=prompt,
+                config=types.GenerateContentConfig(
+                    tools=[types.Tool(google_search=types.GoogleSearch())],
+                    response_mime_type="application/json",
+                    response_json_schema=SCREEN_SCHEMA,
+                    http_options=types.HttpOptions(timeout=20000),
+                ))
+        metrics.count_tokens(resp)
+        result = json.loads(resp.text)
+        print(f"    AI screen {ticker}: routine={result['routine']} risk={result['risk']}")
+        return {"routine": bool(result["routine"]), "risk": result["risk"], "analysis": result["analysis"].strip()}
     except Exception as e:
-        print(f"  Gemini error: {e}")
-        return "⚠️ 有內部人士已提交拋售意向書"
+        print(f"    AI screen error ({ticker}): {e}")
+        return AI_FALLBACK
 
 
-def main():
-    cik_ticker_map = get_sec_ticker_map()
-    print(f"Loaded {len(cik_ticker_map)} CIK-Ticker mappings")
-
-    url = 'https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=144&owner=only&count=40&output=atom'
-    now_utc = datetime.now(timezone.utc)
-    time_limit = now_utc - timedelta(minutes=30)
-
-    response = requests.get(url, headers=SEC_HEADERS)
-    soup = BeautifulSoup(response.content, 'xml')
-    entries = soup.find_all('entry')
-    print(f"Found {len(entries)} Form 144 entries")
-    found_count = 0
-
-    for entry in entries:
-        updated_tag = entry.find('updated')
-        if not updated_tag:
-            continue
-        try:
-            if datetime.fromisoformat(updated_tag.text.replace('Z', '+00:00')).astimezone(timezone.utc) < time_limit:
-                break
-        except Exception:
-            continue
-
-        link = entry.link['href']
-        if supabase_link_exists(link):
-            continue
-
-        title_text = entry.title.text if entry.title else ""
-        txt_link = link.replace('-index.htm', '.txt')
-        txt_response = requests.get(txt_link, headers=SEC_HEADERS)
-
-        if txt_response.status_code != 200:
-            continue
-
-        txt_content = txt_response.text
-        ticker = "N/A"
-        issuer_name = "未知公司"
-
-        sym = re.search(r'<(?:issuerSymbol|issuerTradingSymbol)>\s*([^<]+?)\s*</(?:issuerSymbol|issuerTradingSymbol)>', txt_content, re.IGNORECASE)
-        if sym:
-            ticker = sym.group(1).strip().upper()
-        nm = re.search(r'<(?:nameOfIssuer|issuerName)>\s*([^<]+?)\s*</(?:nameOfIssuer|issuerName)>', txt_content, re.IGNORECASE)
-        if nm:
-            issuer_name = nm.group(1).strip()
-
-        if ticker == "N/A" or issuer_name == "未知公司":
-            sgml = re.search(r'(?:SUBJECT COMPANY|ISSUER)[:\s]*(.*?)(?:FILED BY:|REPORTING-OWNER:|<SEC-DOCUMENT>|</SEC-HEADER>|\Z)', txt_content[:5000], re.DOTALL | re.IGNORECASE)
-            if sgml:
-                block = sgml.group(1)
-                if issuer_name == "未知公司":
-                    cn = re.search(r'COMPANY CONFORMED NAME:\s*([^\n\r]+)', block)
-                    if cn:
-                        issuer_name = cn.group(1).strip()
-                if ticker == "N/A":
-                    ck = re.search(r'CENTRAL INDEX KEY:\s*(\d+)', block)
-                    if ck:
-                        ticker = cik_ticker_map.get(str(int(ck.group(1).strip())), "N/A")
-
-        if ticker == "N/A":
-            cm = re.search(r'\((\d+)\)\s*\(Subject\)', title_text)
-            if cm:
-                ticker = cik_ticker_map.get(str(int(cm.group(1))), "N/A")
-        if issuer_name == "未知公司":
-            tn = re.search(r'144\s*-\s*(.+?)\s*\(\d+\)', title_text)
-            if tn:
-                issuer_name = tn.group(1).strip()
-        if issuer_name == "未知公司":
-            alt = re.search(r'COMPANY CONFORMED NAME:\s*([^\n\r]+)', txt_content[:5000])
-            if alt:
-                issuer_name = alt.group(1).strip()
-
-        print(f"  {issuer_name} ({ticker})")
-
-        # Dedup: skip if same ticker already alerted recently (multiple insiders filing)
-        if ticker != "N/A" and supabase_ticker_recent("form144", ticker, minutes=60):
-            print(f"    Skipped: {ticker} already alerted within 60 min")
-            continue
-
-        price_str, change_str, current_price, change_pct = get_stock_quote(ticker)
-        profile = get_company_profile(ticker)
-        sector = profile["sector"]
-        market_cap_m = profile["marketCap"]
-        sector_emoji = get_sector_emoji(sector)
-
-        # Gate 1: market cap > $5B only
-        MIN_MARKET_CAP = 5000
-        if market_cap_m < MIN_MARKET_CAP:
-            print(f"    Skipped: market cap ${market_cap_m:.0f}M < ${MIN_MARKET_CAP}M")
-            continue
-
-        # Gate 2: AI pre-screen - skip routine selling
-        if ai_is_routine_selling(issuer_name, ticker):
-            print("    Skipped: routine selling (tax/vesting)")
-            supabase_insert({
-                "source": "form144", "ticker": ticker, "company_name": issuer_name,
-                "action": "✅ 常規拋售（已過濾）",
-                "price": current_price, "change_pct": change_pct,
-                "sec_link": link,
-                "extra_data": json.dumps({"sector": sector, "market_cap_m": market_cap_m, "filtered": True})
-            })
-            continue
-
-        inserted = supabase_insert({
+def _screen_all(candidates):
+    """Screen candidates concurrently on a pool of AI_CONCURRENCY threads, results in input order.
+
+    Blocking calls on threads rather than client.aio under asyncio.run: the shared client's
+    async connection pool would stay bound to the first (closed) event loop in daemon mode."""
+    client = get_client()
+    if not client:
+        return [AI_FALLBACK] * len(candidates)
+
+    def screen(c):
+        return ai_screen_selling(client, c["issuer_name"], c["ticker"], c["sector"], c["market_cap_m"])
+    with ThreadPoolExecutor(max_workers=min(AI_CONCURRENCY, len(candidates))) as pool:
+        return list(pool.map(metrics.propagate(screen), candidates))
+
+
+def accepts(category):
+    return category in ('144', '144/A')
+
+
+def gate(entry, txt, recent_tickers):
+    """Parse one Form 144 and apply the cheap gates (cooldown, market cap); the candidate for
+    the Gemini screen, or None when a gate skipped it."""
+    with metrics.stage("parse"):
+        form = parse_form144(txt, entry.title)
+    issuer_name, ticker = form.issuer_name, form.ticker
+    if ticker == "N/A" and form.issuer_cik:
+        ticker = sec_index.ticker_for_cik(form.issuer_cik)
+    if ticker == "N/A" and issuer_name != UNKNOWN_ISSUER:
+        ticker = sec_index.ticker_for_name(issuer_name)
+
+    print(f"  {issuer_name} ({ticker})")
+
+    # Dedup: skip if same ticker already alerted recently (multiple insiders filing)
+    if ticker != "N/A" and ticker in recent_tickers:
+        print(f"    Skipped: {ticker} already alerted within {COOLDOWN_MINUTES} min")
+        metrics.count("skip.cooldown")
+        return None
+
+    profile = get_company_profile(ticker)
+    market_cap_m = profile["marketCap"]
+
+    # Gate 1: market cap > $5B only
+    if market_cap_m < MIN_MARKET_CAP:
+        print(f"    Skipped: market cap ${market_cap_m:.0f}M < ${MIN_MARKET_CAP}M")
+        metrics.count("skip.market_cap")
+        return None
+
+    recent_tickers.add(ticker)
+    return {"issuer_name": issuer_name, "ticker": ticker, "profile": profile,
+            "sector": profile["sector"], "market_cap_m": market_cap_m}
+
+
+def record(entry, c, screen):
+    """Record one screened candidate and send its alert; 1 if an alert went out, else 0."""
+    link = entry.link
+    issuer_name, ticker, sector, market_cap_m = c["issuer_name"], c["ticker"], c["sector"], c["market_cap_m"]
+    price_str, change_str, current_price, change_pct = get_stock_quote(ticker)
+
+    # Gate 2: AI pre-screen - skip routine selling
+    if screen["routine"]:
+        print(f"    Skipped {ticker}: routine selling (tax/vesting)")
+        metrics.count("skip.routine")
+        supabase_buffer({
             "source": "form144", "ticker": ticker, "company_name": issuer_name,
-            "action": "⚠️ Form 144 拋售預警",
+            "action": "✅ 常規拋售（已過濾）",
             "price": current_price, "change_pct": change_pct,
             "sec_link": link,
-            "extra_data": json.dumps({"sector": sector, "industry": profile["industry"], "market_cap_m": market_cap_m})
+            "extra_data": json.dumps({"sector": sector, "market_cap_m": market_cap_m, "filtered": True})
         })
-        if not inserted:
-            print("    Skipped: already in DB or insert failed")
-            continue
-
-        ai_analysis = ai_explain_selling(issuer_name, ticker, sector, market_cap_m)
-        msg = "🚨 <b>【Form 144 內部高管逃生預警】</b>\n"
-        msg += f"🏢 公司：<b>{issuer_name} ({ticker})</b>\n"
-        msg += f"{sector_emoji} 板塊：<b>{sector}</b>\n"
-        msg += f"💲 股價：<b>{price_str}</b>  {change_str}\n"
-        msg += f"💰 市值：<b>${market_cap_m/1000:.1f}B</b>\n"
-        msg += f"🧠 <b>AI 分析：</b>\n{ai_analysis}\n"
-        msg += f"🔗 <a href='{link}'>查看 SEC 原文</a>"
-        send_whale_telegram(msg)
-
-        # Update DB with AI summary
-        supabase_patch(link, {"ai_summary": ai_analysis})
-
-        found_count += 1
-        time.sleep(2)
-
-        if found_count >= 5:
-            break
+        return 0
+
+    ai_analysis = screen["analysis"]
+    if screen["risk"] in RISK_LABEL:
+        ai_analysis += f"\n{RISK_LABEL[screen['risk']]}"
+    inserted = supabase_claim({
+        "source": "form144", "ticker": ticker, "company_name": issuer_name,
+        "action": "⚠️ Form 144 拋售預警",
+        "price": current_price, "change_pct": change_pct,
+        "ai_summary": ai_analysis, "sec_link": link,
+        "extra_data": json.dumps({"sector": sector, "industry": c["profile"]["industry"],
+                                  "market_cap_m": market_cap_m, "risk": screen["risk"]})
+    }, cooldown_minutes=COOLDOWN_MINUTES)
+    if not inserted:
+        print("    Skipped: already in DB, in cooldown or insert failed")
+        metrics.count("skip.claimed")
+        return 0
+
+    msg = "🚨 <b>【Form 144 內部高管逃生預警】</b>\n"
+    msg += f"🏢 公司：<b>{issuer_name} ({ticker})</b>\n"
+    msg += f"{get_sector_emoji(sector)} 板塊：<b>{sector}</b>\n"
+    msg += f"💲 股價：<b>{price_str}</b>  {change_str}\n"
+    msg += f"💰 市值：<b>${market_cap_m/1000:.1f}B</b>\n"
+    msg += f"🧠 <b>AI 分析：</b>\n{ai_analysis}\n"
+    msg += f"🔗 <a href='{link}'>查看 SEC 原文</a>"
+    send_whale_telegram(msg, on_sent=partial(log_alert_latency, entry))
+    return 1
+
+
+def handle(new_entries, cursor):
+    """Run the Form 144 pipeline over new feed entries and advance `cursor` past them."""
+    print(f"Loaded {len(sec_index.load())} CIK-Ticker mappings")
+
+    print(f"Found {len(new_entries)} new Form 144 entries")
+
+    window = unique_filings(new_entries, prefer_role='Subject')
+
+    existing = supabase_existing_links(e.link for e in window)
+    pending = [e for e in window if e.link not in existing]
+    metrics.count("skip.dedup", len(window) - len(pending))
+    recent_tickers = supabase_recent_tickers("form144", minutes=COOLDOWN_MINUTES)
+
+    # Header + the primary Form 144 XML document is all the regex cascade below reads
+    filings = fetch_filings((e.link for e in pending), until=FETCH_UNTIL, max_bytes=FETCH_MAX_BYTES)
+
+    # Phase 1: parse + cheap gates for every filing
+    gated = {}
+    for entry in pending:
+        txt = filings.get(entry.link)
+        try:
+            gated[entry.link] = gate(entry, txt, recent_tickers) if txt is not None else FAILED
+        except Exception as e:
+            print(f"  Parse error: {e}")
+            gated[entry.link] = FAILED
+    queue = [e for e in pending if gated[e.link] not in (None, FAILED)]
+    position = {e.link: i for i, e in enumerate(queue)}
+
+    # Phase 2: screen + record in feed order. Candidates are screened concurrently in batches no
+    # larger than the alert slots left, so nothing past the cap pays for a Gemini call
+    screens, sent = {}, 0
+
+    def run(entry):
+        nonlocal sent
+        c = gated[entry.link]
+        if c is FAILED:
+            return None
+        if c is None:
+            return 0
+        if entry.link not in screens:
+            i = position[entry.link]
+            batch = queue[i:i + min(AI_CONCURRENCY, MAX_ALERTS_PER_RUN - sent)]
+            screens.update(zip((e.link for e in batch), _screen_all([gated[e.link] for e in batch])))
+        n = record(entry, c, screens[entry.link])
+        sent += n
+        return n
+
+    return drain(cursor, new_entries, pending, run, MAX_ALERTS_PER_RUN)
+
+
+def main():
+    with metrics.run(CURSOR):
+        cursor = FeedCursor.load(CURSOR)
+        return handle(read_feed('144', 'only', cursor, FIRST_RUN_MINUTES), cursor)
 
 
 if __name__ == "__main__":
@@ -2,39 +2,92 @@
 # Engine 3: SC 13D/G Institutional Ownership Radar
 # Upgrade: Supabase + Finnhub + Gemini 3.1 Pro background info
 # ==============================================================
-import requests
-from bs4 import BeautifulSoup
+import os
+import sys
 import time
-from datetime import datetime, timezone, timedelta
-import os, re, json
-from google import genai
-from google.genai import types
-
-from utils.supabase import supabase_insert, supabase_link_exists
+import json
+from functools import partial
+
+from utils.gemini import get_client, types
+from utils.edgar import fetch_filings
+from utils.feed import FeedCursor, drain, read_feed, log_alert_latency
+from utils.sec_parse import parse_schedule13, unique_filings
+from utils import metrics, sec_index
+from utils.cache import cache_path, atomic_write
+from utils.supabase import supabase_buffer, supabase_existing_links
 from utils.finnhub import get_stock_quote
 from utils.telegram import send_whale_telegram
 
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
-gemini_client = None
-if GEMINI_API_KEY:
-    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-    print("Gemini 3.1 Pro ready")
+CURSOR = "sc13"
+FIRST_RUN_MINUTES = 15
+FETCH_UNTIL = b'</SEC-HEADER>'
+FETCH_MAX_BYTES = 256 * 1024
+MAX_ALERTS_PER_RUN = 5
 
-SEC_HEADERS = {'User-Agent': 'WhaleRadarBot Admin@kuafuorhk.com'}
+# Filer backgrounds keyed by filer CIK: the same few institutions file most 13G volume
+FILER_CACHE_FILE = cache_path('filer_backgrounds.json')
+FILER_CACHE_TTL = float(os.environ.get('FILER_BACKGROUND_TTL_DAYS', 30)) * 86400
 
+_filer_cache = None
 
-def get_sec_ticker_map():
-    try:
-        resp = requests.get("https://www.sec.gov/files/company_tickers.json", headers=SEC_HEADERS)
-        return {str(v['cik_str']): v['ticker'] for v in resp.json().values()}
-    except Exception as e:
-        print(f"⚠️ SEC ticker map failed: {e}")
-        return {}
+
+def _load_filer_cache():
+    global _filer_cache
+    if _filer_cache is None:
+        try:
+            with open(FILER_CACHE_FILE) as f:
+                _filer_cache = json.load(f)
+        except FileNotFoundError:
+            _filer_cache = {}
+        except Exception as e:
+            print(f"⚠️ Filer background cache unreadable, starting fresh: {e}")
+            _filer_cache = {}
+    return _filer_cache
+
+
+def _filer_key(filer_cik, filer_name):
+    """Cache key: the filer CIK, else its normalised name; None when the header named neither."""
+    if filer_cik:
+        return str(int(filer_cik))
+    if filer_name and filer_name != "Unknown Filer":
+        return f"name:{sec_index.normalize_name(filer_name)}"
+    return None
+
+
+def forget_filer(key):
+    """Drop one cached filer background (by CIK, or 'name:...' key) so the next filing re-asks Gemini."""
+    cache = _load_filer_cache()
+    key = str(int(key)) if str(key).isdigit() else key
+    if cache.pop(key, None) is None:
+        return False
+    atomic_write(FILER_CACHE_FILE, json.dumps(cache, ensure_ascii=False).encode())
+    return True
+
+
+def filer_background(filer_cik, filer_name, subject_name, category):
+    """Cached ai_institution_background: a repeat filer within the TTL costs no LLM call."""
+    key = _filer_key(filer_cik, filer_name)
+    if key is None:
+        # Unparseable header: nothing to look up, and nothing that would be safe to share
+        print("  Filer unknown, no background")
+        return ""
+    cache = _load_filer_cache()
+    hit = cache.get(key)
+    if hit and time.time() - hit["fetched_at"] < FILER_CACHE_TTL:
+        print(f"  Filer background cache hit: {filer_name}")
+        metrics.count("llm.cache_hits")
+        return hit["background"]
+    bg = ai_institution_background(filer_name, subject_name, category)
+    if bg:
+        cache[key] = {"name": filer_name, "background": bg, "fetched_at": time.time()}
+        atomic_write(FILER_CACHE_FILE, json.dumps(cache, ensure_ascii=False).encode())
+    return bg
 
 
 def ai_institution_background(filer_name, subject_name, category):
-    if not gemini_client:
+    client = get_client()
+    if not client:
         return ""
     try:
         prompt = (
@@ -45,102 +98,105 @@ def ai_institution_background(filer_name, subject_name, category):
             f"AUM if known, notable past investments, and reputation. "
             f"End with threat level: 🔴 aggressive activist, 🟡 notable player, 🟢 passive investor."
         )
-        response = gemini_client.models.generate_content(
-            model="gemini-3.1-pro-preview",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-                http_options=types.HttpOptions(timeout=20000),
+        with metrics.stage("llm"):
+            response = client.models.generate_content(
+                model="gemini-3.1-pro-preview",
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    tools=[types.Tool(google_search=types.GoogleSearch())],
+                    http_options=types.HttpOptions(timeout=20000),
+                )
             )
-        )
+        metrics.count_tokens(response)
         return response.text.strip()
     except Exception as e:
         print(f"  Gemini error: {e}")
         return ""
 
 
+def accepts(category):
+    return category.startswith('SC 13D') or category.startswith('SC 13G')
+
+
+def process(entry, txt):
+    """Alert on one downloaded SC 13D/G header; returns 1 (every new filing is sent)."""
+    link, category = entry.link, entry.category
+    with metrics.stage("parse"):
+        sc13 = parse_schedule13(txt)
+    subject_name, filer_name = sc13.subject_name, sc13.filer_name
+
+    ticker = "N/A"
+    if sc13.subject_cik:
+        ticker = sec_index.ticker_for_cik(sc13.subject_cik)
+    if ticker == "N/A" and subject_name != "Unknown Target":
+        ticker = sec_index.ticker_for_name(subject_name)
+
+    price_str, change_str, cur_price, chg_pct = get_stock_quote(ticker)
+
+    if category.startswith('SC 13D'):
+        intent = "🔥 <b>主動舉牌 (可能介入經營)</b>"
+    else:
+        intent = "🤝 <b>被動投資 (純財務投資)</b>"
+
+    bg = filer_background(sc13.filer_cik, filer_name, subject_name, category)
+
+    msg = "🦈 <b>【機構大鯊舉牌雷達】</b>\n"
+    msg += f"🎯 獵物 (公司): <b>{subject_name} ({ticker})</b>\n"
+    if ticker != "N/A":
+        msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
+    msg += f"💼 獵人 (機構): <b>{filer_name}</b>\n"
+    msg += f"📝 類型: {category}\n"
+    msg += f"{intent}\n"
+    if bg:
+        msg += f"🧠 <b>機構背景：</b>\n{bg}\n"
+    msg += f"🔗 <a href='{link}'>查看 SEC 原文</a>"
+
+    send_whale_telegram(msg, on_sent=partial(log_alert_latency, entry))
+    print(f"  Sent: {subject_name} <- {filer_name}")
+
+    supabase_buffer({
+        "source": "sc13", "ticker": ticker, "company_name": subject_name,
+        "action": category, "reporter_name": filer_name,
+        "price": cur_price, "change_pct": chg_pct,
+        "ai_summary": bg, "sec_link": link,
+        "extra_data": json.dumps({"intent": "activist" if category.startswith('SC 13D') else "passive"})
+    })
+    return 1
+
+
+def handle(new_entries, cursor):
+    """Run the SC 13D/G pipeline over new feed entries and advance `cursor` past them."""
+    print(f"Found {len(new_entries)} new SC 13 entries")
+
+    window = [e for e in new_entries if accepts(e.category)]
+    window = unique_filings(window, prefer_role='Subject')
+
+    existing = supabase_existing_links(e.link for e in window)
+    pending = [e for e in window if e.link not in existing]
+    metrics.count("skip.dedup", len(window) - len(pending))
+
+    # Everything we read lives in the SEC header; stop the download there
+    filings = fetch_filings((e.link for e in pending), until=FETCH_UNTIL, max_bytes=FETCH_MAX_BYTES)
+
+    def run(entry):
+        txt = filings.get(entry.link)
+        return None if txt is None else process(entry, txt)
+
+    return drain(cursor, new_entries, pending, run, MAX_ALERTS_PER_RUN)
+
+
 def main():
-    cik_ticker_map = get_sec_ticker_map()
-    now_utc = datetime.now(timezone.utc)
-    time_limit = now_utc - timedelta(minutes=15)
-
-    resp = requests.get(
-        'https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=SC+13&owner=only&count=40&output=atom',
-        headers=SEC_HEADERS
-    )
-    soup = BeautifulSoup(resp.content, 'xml')
-    entries = soup.find_all('entry')
-    print(f"Found {len(entries)} SC 13 entries")
-    found = 0
-
-    for entry in entries:
-        try:
-            if datetime.fromisoformat(entry.updated.text.replace('Z', '+00:00')).astimezone(timezone.utc) < time_limit:
-                break
-        except Exception:
-            continue
-
-        category = entry.category['term'] if entry.category else ""
-        if not (category.startswith('SC 13D') or category.startswith('SC 13G')):
-            continue
-
-        link = entry.link['href']
-        if supabase_link_exists(link):
-            continue
-
-        txt_resp = requests.get(link.replace('-index.htm', '.txt'), headers=SEC_HEADERS)
-        if txt_resp.status_code != 200:
-            continue
-
-        txt = txt_resp.text
-        subj_match = re.search(r'<SUBJECT-COMPANY>.*?<CONFORMED-NAME>([^\n]+)', txt, re.DOTALL)
-        filer_match = re.search(r'<FILED-BY>.*?<CONFORMED-NAME>([^\n]+)', txt, re.DOTALL)
-        subject_name = subj_match.group(1).strip() if subj_match else "Unknown Target"
-        filer_name = filer_match.group(1).strip() if filer_match else "Unknown Filer"
-
-        ticker = "N/A"
-        cik_match = re.search(r'<SUBJECT-COMPANY>.*?CENTRAL INDEX KEY:\s*(\d+)', txt[:5000], re.DOTALL)
-        if cik_match:
-            ticker = cik_ticker_map.get(str(int(cik_match.group(1).strip())), "N/A")
-
-        price_str, change_str, cur_price, chg_pct = get_stock_quote(ticker)
-
-        if category.startswith('SC 13D'):
-            intent = "🔥 <b>主動舉牌 (可能介入經營)</b>"
-        else:
-            intent = "🤝 <b>被動投資 (純財務投資)</b>"
-
-        bg = ai_institution_background(filer_name, subject_name, category)
-
-        msg = "🦈 <b>【機構大鯊舉牌雷達】</b>\n"
-        msg += f"🎯 獵物 (公司): <b>{subject_name} ({ticker})</b>\n"
-        if ticker != "N/A":
-            msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
-        msg += f"💼 獵人 (機構): <b>{filer_name}</b>\n"
-        msg += f"📝 類型: {category}\n"
-        msg += f"{intent}\n"
-        if bg:
-            msg += f"🧠 <b>機構背景：</b>\n{bg}\n"
-        msg += f"🔗 <a href='{link}'>查看 SEC 原文</a>"
-
-        send_whale_telegram(msg)
-        print(f"  Sent: {subject_name} <- {filer_name}")
-
-        supabase_insert({
-            "source": "sc13", "ticker": ticker, "company_name": subject_name,
-            "action": category, "reporter_name": filer_name,
-            "price": cur_price, "change_pct": chg_pct,
-            "ai_summary": bg, "sec_link": link,
-            "extra_data": json.dumps({"intent": "activist" if category.startswith('SC 13D') else "passive"})
-        })
-        found += 1
-        time.sleep(2)
-
-        if found >= 5:
-            break
+    with metrics.run(CURSOR):
+        cursor = FeedCursor.load(CURSOR)
+        return handle(read_feed('SC+13', 'only', cursor, FIRST_RUN_MINUTES), cursor)
 
 
 if __name__ == "__main__":
+    # python institutional.py --forget <filer CIK> [...]: invalidate cached filer backgrounds
+    if sys.argv[1:2] == ["--forget"]:
+        for key in sys.argv[2:]:
+            print(f"{key}: {'forgotten' if forget_filer(key) else 'not cached'}")
+        sys.exit(0)
     try:
         main()
     except Exception as e:
@@ -0,0 +1,56 @@
+-- Run this in your Supabase SQL Editor (after secretary/supabase_setup.sql)
+
+-- claim_alert(alert, cooldown_minutes): atomic dedup + cooldown + insert for whale_alerts.
+-- Returns true when this caller inserted the row (and should send the alert), false when the
+-- sec_link is already recorded or the same source+ticker was alerted within cooldown_minutes.
+-- Called by the engines as POST /rest/v1/rpc/claim_alert (utils/supabase.py: supabase_claim).
+
+-- Columns the engines write that the original table definition lacks
+ALTER TABLE whale_alerts ADD COLUMN IF NOT EXISTS ai_summary TEXT;
+ALTER TABLE whale_alerts ADD COLUMN IF NOT EXISTS sentiment  TEXT;
+
+-- The cooldown lookup filters on source + ticker + created_at
+CREATE INDEX IF NOT EXISTS idx_whale_alerts_source_ticker_created
+    ON whale_alerts(source, ticker, created_at);
+
+CREATE OR REPLACE FUNCTION claim_alert(alert JSONB, cooldown_minutes INTEGER DEFAULT 0)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_source TEXT := alert->>'source';
+    v_ticker TEXT := alert->>'ticker';
+    v_link   TEXT := alert->>'sec_link';
+BEGIN
+    -- Serialise claims on the same filing, and on the same source+ticker when a cooldown
+    -- applies, so two concurrent runs cannot both pass the checks below (released at commit)
+    PERFORM pg_advisory_xact_lock(hashtext('claim_alert:link:' || coalesce(v_link, '')));
+    IF cooldown_minutes > 0 AND coalesce(v_ticker, 'N/A') <> 'N/A' THEN
+        PERFORM pg_advisory_xact_lock(hashtext('claim_alert:ticker:' || coalesce(v_source, '') || ':' || v_ticker));
+    END IF;
+
+    IF v_link IS NOT NULL AND EXISTS (SELECT 1 FROM whale_alerts WHERE sec_link = v_link) THEN
+        RETURN FALSE;
+    END IF;
+
+    IF cooldown_minutes > 0 AND coalesce(v_ticker, 'N/A') <> 'N/A' AND EXISTS (
+        SELECT 1 FROM whale_alerts
+        WHERE source = v_source AND ticker = v_ticker
+          AND created_at >= now() - make_interval(mins => cooldown_minutes)
+    ) THEN
+        RETURN FALSE;
+    END IF;
+
+    -- Any whale_alerts column may appear in `alert`; id / created_at fall back to their defaults
+    INSERT INTO whale_alerts
+    SELECT (jsonb_populate_record(
+        NULL::whale_alerts,
+        jsonb_build_object('id', gen_random_uuid(), 'created_at', now()) || alert
+    )).*
+    ON CONFLICT (sec_link) DO NOTHING;
+    RETURN FOUND;
+END;
+$$;
+
+-- Let PostgREST pick up the new function without a restart
+NOTIFY pgrst, 'reload schema';
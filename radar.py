@@ -0,0 +1,145 @@
+# ==================== radar.py ====================
+# SEC engine orchestrator: one interpreter, four engines
+# Shared state (EDGAR session, ticker map, Gemini client) is loaded once
+# and the four pipelines run concurrently off one combined feed poll:
+# each new getcurrent entry is fetched and parsed once, then routed by
+# form type to its engine's handle().
+# `python radar.py --daemon` keeps polling on a market-hours cadence
+# (Railway service, see Dockerfile.radar) instead of one cron-sized pass.
+# ==================================================
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from utils import metrics, sec_index, quote_stream, telegram
+from utils.feed import FeedCursor, read_current
+from utils.supabase import supabase_flush
+import whale
+import form144
+import institutional
+import ai_analyst
+
+ENGINES = {
+    "form4": whale,
+    "form144": form144,
+    "sc13": institutional,
+    "8k": ai_analyst,
+}
+
+ET = ZoneInfo("America/New_York")
+# Scale every daemon interval, e.g. 2 to halve the SEC request rate
+POLL_SCALE = float(os.environ.get("RADAR_POLL_SCALE", 1))
+
+_stop = threading.Event()
+
+
+def poll_interval(now=None):
+    """Seconds between daemon cycles: tight right after the 4pm ET close when insiders file,
+    relaxed intraday and in the evening, slow overnight and on weekends.
+
+    Each cycle costs one conditional request for the combined feed (more pages only when a
+    cursor is behind a full page) plus the new filings, far under the SEC's 10 req/s
+    fair-access limit even at the tightest cadence."""
+    now = (now or datetime.now(ET)).astimezone(ET)
+    if now.weekday() >= 5:
+        seconds = 900
+    else:
+        minutes = now.hour * 60 + now.minute
+        if 16 * 60 <= minutes < 18 * 60 + 30:
+            seconds = 20
+        elif 6 * 60 <= minutes < 16 * 60:
+            seconds = 60
+        elif 18 * 60 + 30 <= minutes < 22 * 60:
+            seconds = 120
+        else:
+            seconds = 600
+    return seconds * POLL_SCALE
+
+
+def run_engine(name, window, cursor):
+    start = time.monotonic()
+    try:
+        with metrics.run(name):
+            found = ENGINES[name].handle(window, cursor)
+        return {"engine": name, "ok": True, "found": found or 0, "seconds": time.monotonic() - start}
+    except Exception as e:
+        print(f"{name} engine error: {e}")
+        return {"engine": name, "ok": False, "error": str(e), "seconds": time.monotonic() - start}
+
+
+def run_once(names):
+    # The shared feed read and the end-of-cycle flush are recorded as engine "radar"
+    with metrics.run("radar"):
+        # Warm shared caches before the engines fan out so they don't race to download them
+        sec_index.load()
+
+        routes = {}
+        for name in names:
+            engine = ENGINES[name]
+            # An engine that cannot run (8-K without Gemini) would hold the shared horizon back
+            if hasattr(engine, 'ready') and not engine.ready():
+                print(f"⏸️ {name} not configured, skipped this cycle")
+                continue
+            routes[name] = (FeedCursor.load(engine.CURSOR), engine.accepts, engine.FIRST_RUN_MINUTES)
+        if not routes:
+            return []
+        windows = read_current(routes)
+
+        with ThreadPoolExecutor(max_workers=len(routes)) as pool:
+            futures = [pool.submit(run_engine, name, windows[name], routes[name][0]) for name in routes]
+            results = [f.result() for f in futures]
+        # Audit / post-send rows the engines buffered this cycle go out as one batch
+        supabase_flush()
+
+        print("📊 Radar run summary")
+        for r in results:
+            if r["ok"]:
+                print(f"  ✅ {r['engine']:<8} {r['found']} alert(s) in {r['seconds']:.1f}s")
+            else:
+                print(f"  ❌ {r['engine']:<8} failed in {r['seconds']:.1f}s: {r['error']}")
+        return results
+
+
+def daemon(names):
+    signal.signal(signal.SIGTERM, lambda *_: _stop.set())
+    print(f"🛰️ Radar daemon started: {', '.join(names)}")
+    # Live last-trade table so alert enrichment skips the Finnhub REST round trip
+    stream = quote_stream.start()
+    while not _stop.is_set():
+        start = time.monotonic()
+        try:
+            run_once(names)
+        except Exception as e:
+            print(f"Radar cycle error: {e}")
+        wait = max(0.0, poll_interval() - (time.monotonic() - start))
+        _stop.wait(wait)
+    if stream is not None:
+        stream.stop()
+    telegram.flush(timeout=60)
+    print("🛑 Radar daemon stopped")
+
+
+def main(names=None, daemon_mode=False):
+    names = names or list(ENGINES)
+    unknown = [n for n in names if n not in ENGINES]
+    if unknown:
+        raise SystemExit(f"Unknown engine(s): {', '.join(unknown)} (choose from {', '.join(ENGINES)})")
+    if daemon_mode:
+        daemon(names)
+        return []
+    results = run_once(names)
+    # Alerts are delivered by a background sender; wait for the queue to drain
+    telegram.flush()
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    daemon_mode = "--daemon" in args
+    results = main([a for a in args if a != "--daemon"], daemon_mode=daemon_mode)
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
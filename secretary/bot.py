@@ -8,6 +8,7 @@ from handlers.message import handle_message
 from handlers.setting import setting_command
 from services.briefing import schedule_daily_briefings
 import services.reminder_store as reminder_store
+from utils.postgrest import get_async_client
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -35,10 +36,14 @@ def main():
 
     async def post_init(app):
         reminder_store.set_app(app)
-        reminder_store.load_pending_reminders()
+        await reminder_store.load_pending_reminders()
         await schedule_daily_briefings(app)
 
+    async def post_shutdown(app):
+        await get_async_client().aclose()
+
     app.post_init = post_init
+    app.post_shutdown = post_shutdown
 
     logger.info("🤖 Secretary Bot starting...")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
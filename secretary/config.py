@@ -14,14 +14,14 @@ WHALE_RADAR_REPO = os.environ.get('WHALE_RADAR_REPO', 'kuafuro/whale-rader')
 GOOGLE_TOKEN_B64 = os.environ.get('GOOGLE_TOKEN_B64')
 
 
-def get_google_token(chat_id: int) -> str | None:
+async def get_google_token(chat_id: int) -> str | None:
     """Return per-member Google token. Priority: env var → DB → default env var."""
     env_token = os.environ.get(f'GOOGLE_TOKEN_B64_{chat_id}')
     if env_token:
         return env_token
     try:
         from services.member_settings import get_google_token as _db_token
-        db_token = _db_token(chat_id)
+        db_token = await _db_token(chat_id)
         if db_token:
             return db_token
     except Exception:
@@ -66,7 +66,7 @@ async def portfolio_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args  # list of words after /portfolio
 
     if not args:
-        result = _portfolio.list_holdings()
+        result = await _portfolio.list_holdings()
         await update.message.reply_text(result)
         return
 
@@ -85,7 +85,7 @@ async def portfolio_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             shares = float(args[2])
             price = float(args[3])
             date = args[4] if len(args) >= 5 else None
-            result = _portfolio.upsert(ticker, shares, price, date)
+            result = await _portfolio.upsert(ticker, shares, price, date)
             await update.message.reply_text(result)
         except ValueError:
             await update.message.reply_text("❌ 股數和均價必須是數字")
@@ -95,7 +95,7 @@ async def portfolio_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("用法：/portfolio remove TICKER\n例：/portfolio remove TSLA")
             return
         ticker = args[1].upper()
-        result = _portfolio.remove(ticker)
+        result = await _portfolio.remove(ticker)
         await update.message.reply_text(result)
 
     else:
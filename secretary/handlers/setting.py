@@ -50,7 +50,7 @@ async def setting_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("用法：/setting name 你的名字")
             return
         name = " ".join(args[1:])
-        ok = ms.upsert(chat_id, display_name=name)
+        ok = await ms.upsert(chat_id, display_name=name)
         if ok:
             await update.message.reply_text(f"✅ 名稱已更新為：{name}")
         else:
@@ -72,7 +72,7 @@ async def setting_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not _looks_like_b64(token):
             await update.message.reply_text("⚠️ Token 格式不對，請重新確認。")
             return
-        ok = ms.upsert(chat_id, google_token_b64=token)
+        ok = await ms.upsert(chat_id, google_token_b64=token)
         if ok:
             await context.bot.send_message(
                 chat_id=chat_id,
@@ -96,7 +96,7 @@ async def setting_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def _show_status(update: Update, chat_id: int):
-    row = ms.get(chat_id)
+    row = await ms.get(chat_id)
     name = row.get("display_name") or "（未設定）" if row else "（未設定）"
     has_cal = bool(row.get("google_token_b64")) if row else False
     cal_status = "✅ 已連接" if has_cal else "❌ 未設定"
@@ -4,7 +4,6 @@ import logging
 from datetime import datetime, timezone, timedelta
 from openai import AsyncOpenAI
 
-import requests as _requests
 import config
 import services.member_settings as ms
 import services.reminder_store as reminder_store
@@ -12,6 +11,7 @@ from services.calendar_service import CalendarService
 from services.task_store import TaskStore
 from services.team_monitor import get_team_status_raw
 from services.portfolio_store import PortfolioStore
+from utils.postgrest import get_async_client
 
 _portfolio = PortfolioStore()
 
@@ -28,29 +28,17 @@ _histories: dict[int, list] = {}
 HISTORY_LIMIT = 30  # messages kept in DB query and in-memory
 
 
-def _supabase_headers() -> dict:
-    return {
-        "apikey": config.SUPABASE_KEY,
-        "Authorization": f"Bearer {config.SUPABASE_KEY}",
-        "Content-Type": "application/json",
-    }
-
-
-def _history_load(chat_id: int) -> list:
+async def _history_load(chat_id: int) -> list:
     """Fetch last HISTORY_LIMIT messages for chat_id from Supabase."""
-    if not (config.SUPABASE_URL and config.SUPABASE_KEY):
+    db = get_async_client()
+    if not db:
         return []
     try:
-        r = _requests.get(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_chat_history",
-            headers=_supabase_headers(),
-            params={
-                "chat_id": f"eq.{chat_id}",
-                "order": "created_at.desc",
-                "limit": HISTORY_LIMIT,
-            },
-            timeout=10,
-        )
+        r = await db.select("secretary_chat_history", {
+            "chat_id": f"eq.{chat_id}",
+            "order": "created_at.desc",
+            "limit": HISTORY_LIMIT,
+        })
         if r.status_code != 200:
             return []
         rows = r.json()
@@ -61,24 +49,20 @@ def _history_load(chat_id: int) -> list:
         return []
 
 
-def _history_save(chat_id: int, message: dict) -> None:
+async def _history_save(chat_id: int, message: dict) -> None:
     """Append a single message to Supabase history."""
-    if not (config.SUPABASE_URL and config.SUPABASE_KEY):
+    db = get_async_client()
+    if not db:
         return
     try:
-        _requests.post(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_chat_history",
-            headers=_supabase_headers(),
-            json={"chat_id": str(chat_id), "message": message},
-            timeout=10,
-        )
+        await db.insert("secretary_chat_history", {"chat_id": str(chat_id), "message": message})
     except Exception as e:
         logger.error(f"History save error: {e}")
 
 
-def _get_calendar(chat_id: int) -> CalendarService:
+async def _get_calendar(chat_id: int) -> CalendarService:
     if chat_id not in _calendars:
-        _calendars[chat_id] = CalendarService(token_b64=config.get_google_token(chat_id))
+        _calendars[chat_id] = CalendarService(token_b64=await config.get_google_token(chat_id))
     return _calendars[chat_id]
 
 
@@ -396,19 +380,19 @@ class SecretaryAgent:
             base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
         )
 
-    def _get_history(self, chat_id: int) -> list:
+    async def _get_history(self, chat_id: int) -> list:
         if chat_id not in _histories:
-            _histories[chat_id] = _history_load(chat_id)
+            _histories[chat_id] = await _history_load(chat_id)
         return _histories[chat_id]
 
-    def _append(self, chat_id: int, message: dict) -> None:
+    async def _append(self, chat_id: int, message: dict) -> None:
         """Append message to in-memory history and persist to Supabase."""
-        history = self._get_history(chat_id)
+        history = await self._get_history(chat_id)
         history.append(message)
         # Trim in-memory to HISTORY_LIMIT
         if len(history) > HISTORY_LIMIT:
             del history[:-HISTORY_LIMIT]
-        _history_save(chat_id, message)
+        await _history_save(chat_id, message)
 
     async def _execute_tool(self, name: str, args: dict, chat_id: int) -> str:
         try:
@@ -418,10 +402,10 @@ class SecretaryAgent:
 
             elif name == "get_schedule":
                 date_str = args.get("date", datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%d'))
-                return _get_calendar(chat_id).get_events(date_str)
+                return (await _get_calendar(chat_id)).get_events(date_str)
 
             elif name == "add_event":
-                return _get_calendar(chat_id).add_event(
+                return (await _get_calendar(chat_id)).add_event(
                     title=args["title"],
                     date=args["date"],
                     time=args["time"],
@@ -430,19 +414,19 @@ class SecretaryAgent:
                 )
 
             elif name == "add_task":
-                return _get_task_store(chat_id).add(args["title"], args.get("due_date"))
+                return await _get_task_store(chat_id).add(args["title"], args.get("due_date"))
 
             elif name == "list_tasks":
-                return _get_task_store(chat_id).list_tasks(show_completed=args.get("show_completed", False))
+                return await _get_task_store(chat_id).list_tasks(show_completed=args.get("show_completed", False))
 
             elif name == "complete_task":
-                return _get_task_store(chat_id).complete(args["task_id"])
+                return await _get_task_store(chat_id).complete(args["task_id"])
 
             elif name == "delete_task":
-                return _get_task_store(chat_id).delete(args["task_id"])
+                return await _get_task_store(chat_id).delete(args["task_id"])
 
             elif name == "update_event":
-                return _get_calendar(chat_id).update_event(
+                return (await _get_calendar(chat_id)).update_event(
                     event_id=args["event_id"],
                     title=args.get("title"),
                     date=args.get("date"),
@@ -452,30 +436,30 @@ class SecretaryAgent:
                 )
 
             elif name == "delete_event":
-                return _get_calendar(chat_id).delete_event(args["event_id"])
+                return (await _get_calendar(chat_id)).delete_event(args["event_id"])
 
             elif name == "check_team_status":
                 return await get_team_status_raw()
 
             elif name == "get_latest_alerts":
-                return _get_latest_alerts(args.get("limit", 5))
+                return await _get_latest_alerts(args.get("limit", 5))
 
             elif name == "get_my_settings":
-                row = ms.get(chat_id)
+                row = await ms.get(chat_id)
                 display_name = row.get("display_name") or "（未設定）" if row else "（未設定）"
-                has_cal = bool(config.get_google_token(chat_id))
+                has_cal = bool(await config.get_google_token(chat_id))
                 cal_status = "✅ 已連接" if has_cal else "❌ 未設定"
                 return f"顯示名稱：{display_name}\nGoogle Calendar：{cal_status}"
 
             elif name == "set_display_name":
-                ok = ms.upsert(chat_id, display_name=args["name"])
+                ok = await ms.upsert(chat_id, display_name=args["name"])
                 return f"✅ 名稱已設定為：{args['name']}" if ok else "❌ 儲存失敗"
 
             elif name == "list_portfolio":
-                return _portfolio.list_holdings()
+                return await _portfolio.list_holdings()
 
             elif name == "upsert_holding":
-                return _portfolio.upsert(
+                return await _portfolio.upsert(
                     ticker=args["ticker"],
                     shares=float(args["shares"]),
                     open_price=float(args["open_price"]),
@@ -483,18 +467,18 @@ class SecretaryAgent:
                 )
 
             elif name == "remove_holding":
-                return _portfolio.remove(args["ticker"])
+                return await _portfolio.remove(args["ticker"])
 
             elif name == "set_reminder":
                 HKT = timezone(timedelta(hours=8))
                 remind_at = datetime.strptime(args["remind_at"], "%Y-%m-%d %H:%M").replace(tzinfo=HKT)
                 if remind_at <= datetime.now(HKT):
                     return "❌ 提醒時間必須是未來時間"
-                rid = reminder_store.add_reminder(chat_id, args["message"], remind_at)
+                rid = await reminder_store.add_reminder(chat_id, args["message"], remind_at)
                 return f"✅ 提醒已設定（ID: {rid}）：{args['message']} @ {args['remind_at']}"
 
             elif name == "list_reminders":
-                items = reminder_store.list_reminders(chat_id)
+                items = await reminder_store.list_reminders(chat_id)
                 if not items:
                     return "⏰ 沒有待發送的提醒"
                 lines = ["⏰ 待發送提醒："]
@@ -504,7 +488,7 @@ class SecretaryAgent:
                 return "\n".join(lines)
 
             elif name == "cancel_reminder":
-                ok = reminder_store.cancel_reminder(args["reminder_id"])
+                ok = await reminder_store.cancel_reminder(args["reminder_id"])
                 return "✅ 提醒已取消" if ok else "❌ 找不到該提醒"
 
             return f"未知工具：{name}"
@@ -523,11 +507,11 @@ class SecretaryAgent:
         else:
             user_content = user_message
 
-        self._append(chat_id, {"role": "user", "content": user_content})
+        await self._append(chat_id, {"role": "user", "content": user_content})
 
         # Function calling loop (max 5 rounds)
         for _ in range(5):
-            history = self._get_history(chat_id)
+            history = await self._get_history(chat_id)
             response = await self.client.chat.completions.create(
                 model="gemini-3.1-pro-preview",
                 messages=[{"role": "system", "content": SYSTEM_PROMPT}] + history,
@@ -535,7 +519,7 @@ class SecretaryAgent:
             )
             msg = response.choices[0].message
             msg_dict = msg.model_dump(exclude_none=True)
-            self._append(chat_id, msg_dict)
+            await self._append(chat_id, msg_dict)
 
             if not msg.tool_calls:
                 return (msg.content or "✅ 完成。").strip()
@@ -546,22 +530,19 @@ class SecretaryAgent:
                 logger.info(f"Calling tool: {name}({args})")
                 result = await self._execute_tool(name, args, chat_id)
                 tool_msg = {"role": "tool", "tool_call_id": tc.id, "content": result}
-                self._append(chat_id, tool_msg)
+                await self._append(chat_id, tool_msg)
 
         return "✅ 完成。"
 
 
-def _get_latest_alerts(limit: int = 5) -> str:
-    if not config.SUPABASE_URL or not config.SUPABASE_KEY:
+async def _get_latest_alerts(limit: int = 5) -> str:
+    db = get_async_client()
+    if not db:
         return "Supabase 未設定"
-    import requests
     try:
-        headers = {"apikey": config.SUPABASE_KEY, "Authorization": f"Bearer {config.SUPABASE_KEY}"}
-        r = requests.get(
-            f"{config.SUPABASE_URL}/rest/v1/whale_alerts",
-            headers=headers,
-            params={"order": "created_at.desc", "limit": limit}
-        )
+        # Backfilled Form 144 / 8-K rows (action "...（回填）") are history, not alerts
+        r = await db.select("whale_alerts", {"order": "created_at.desc", "limit": limit,
+                                             "action": "not.like.*（回填）"})
         if r.status_code != 200:
             return f"查詢失敗：{r.status_code}"
         data = r.json()
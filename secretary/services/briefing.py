@@ -35,7 +35,7 @@ async def generate_briefing() -> str:
     lines.append("")
 
     # Pending tasks
-    task_list = tasks.list_tasks(show_completed=False)
+    task_list = await tasks.list_tasks(show_completed=False)
     lines.append(task_list)
     lines.append("")
 
@@ -1,7 +1,7 @@
 import logging
-import requests
 
 import config
+from utils.postgrest import get_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -9,26 +9,16 @@ logger = logging.getLogger(__name__)
 class PortfolioStore:
     """Manages portfolio_holdings in Supabase for CFO daily_report fallback."""
 
-    def _headers(self):
-        return {
-            "apikey": config.SUPABASE_KEY,
-            "Authorization": f"Bearer {config.SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation",
-        }
+    TABLE = "portfolio_holdings"
 
     def _ok(self):
         return bool(config.SUPABASE_URL and config.SUPABASE_KEY)
 
-    def list_holdings(self) -> str:
+    async def list_holdings(self) -> str:
         if not self._ok():
             return "❌ Supabase 未設定"
         try:
-            r = requests.get(
-                f"{config.SUPABASE_URL}/rest/v1/portfolio_holdings",
-                headers=self._headers(),
-                params={"order": "ticker", "active": "eq.true"},
-            )
+            r = await get_async_client().select(self.TABLE, {"order": "ticker", "active": "eq.true"})
             items = r.json() if r.status_code == 200 else []
         except Exception as e:
             return f"查詢失敗：{e}"
@@ -39,17 +29,14 @@ class PortfolioStore:
             lines.append(f"  {h['ticker']}  {h['shares']} 股 @ {h['open_price']}  {h.get('open_date','')}")
         return "\n".join(lines)
 
-    def upsert(self, ticker: str, shares: float, open_price: float, open_date: str = None) -> str:
+    async def upsert(self, ticker: str, shares: float, open_price: float, open_date: str = None) -> str:
         if not self._ok():
             return "❌ Supabase 未設定"
         ticker = ticker.upper()
         try:
+            db = get_async_client()
             # Check if exists
-            r = requests.get(
-                f"{config.SUPABASE_URL}/rest/v1/portfolio_holdings",
-                headers=self._headers(),
-                params={"ticker": f"eq.{ticker}"},
-            )
+            r = await db.select(self.TABLE, {"ticker": f"eq.{ticker}"})
             exists = r.status_code == 200 and len(r.json()) > 0
 
             data = {"ticker": ticker, "shares": shares, "open_price": open_price, "active": True}
@@ -57,35 +44,22 @@ class PortfolioStore:
                 data["open_date"] = open_date
 
             if exists:
-                r = requests.patch(
-                    f"{config.SUPABASE_URL}/rest/v1/portfolio_holdings",
-                    headers=self._headers(),
-                    params={"ticker": f"eq.{ticker}"},
-                    json=data,
-                )
+                r = await db.update(self.TABLE, {"ticker": f"eq.{ticker}"}, data, prefer="return=representation")
             else:
-                r = requests.post(
-                    f"{config.SUPABASE_URL}/rest/v1/portfolio_holdings",
-                    headers=self._headers(),
-                    json=data,
-                )
+                r = await db.insert(self.TABLE, data, prefer="return=representation")
             if r.status_code in (200, 201):
                 return f"✅ {ticker} 已{'更新' if exists else '新增'}：{shares} 股 @ {open_price}"
             return f"❌ 失敗：{r.status_code} {r.text[:200]}"
         except Exception as e:
             return f"錯誤：{e}"
 
-    def remove(self, ticker: str) -> str:
+    async def remove(self, ticker: str) -> str:
         if not self._ok():
             return "❌ Supabase 未設定"
         ticker = ticker.upper()
         try:
-            r = requests.patch(
-                f"{config.SUPABASE_URL}/rest/v1/portfolio_holdings",
-                headers=self._headers(),
-                params={"ticker": f"eq.{ticker}"},
-                json={"active": False},
-            )
+            r = await get_async_client().update(self.TABLE, {"ticker": f"eq.{ticker}"}, {"active": False},
+                                                prefer="return=representation")
             if r.status_code in (200, 204):
                 return f"✅ {ticker} 已從持倉移除"
             return f"❌ 失敗：{r.status_code} {r.text[:200]}"
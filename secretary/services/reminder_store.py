@@ -2,11 +2,11 @@ import logging
 import uuid
 from datetime import datetime, timezone, timedelta
 
-import requests
 from apscheduler.jobstores.base import JobLookupError
 
 import config
 from services.scheduler import get_scheduler
+from utils.postgrest import get_async_client
 
 logger = logging.getLogger(__name__)
 HKT = timezone(timedelta(hours=8))
@@ -22,54 +22,33 @@ def set_app(app) -> None:
     _use_supabase = bool(config.SUPABASE_URL and config.SUPABASE_KEY)
 
 
-def _headers() -> dict:
-    return {
-        "apikey": config.SUPABASE_KEY,
-        "Authorization": f"Bearer {config.SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation",
-    }
+TABLE = "secretary_reminders"
 
 
-def _db_insert(reminder_id: str, chat_id: int, message: str, remind_at: datetime) -> None:
+async def _db_insert(reminder_id: str, chat_id: int, message: str, remind_at: datetime) -> None:
     try:
-        requests.post(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_reminders",
-            headers=_headers(),
-            json={
-                "id": reminder_id,
-                "chat_id": str(chat_id),
-                "message": message,
-                "remind_at": remind_at.isoformat(),
-                "sent": False,
-            },
-            timeout=10,
-        )
+        # id is the primary key, so a retried insert cannot duplicate the reminder
+        await get_async_client().insert(TABLE, {
+            "id": reminder_id,
+            "chat_id": str(chat_id),
+            "message": message,
+            "remind_at": remind_at.isoformat(),
+            "sent": False,
+        }, retry=True)
     except Exception as e:
         logger.error(f"Reminder DB insert error: {e}")
 
 
-def _db_mark_sent(reminder_id: str) -> None:
+async def _db_mark_sent(reminder_id: str) -> None:
     try:
-        requests.patch(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_reminders",
-            headers=_headers(),
-            params={"id": f"eq.{reminder_id}"},
-            json={"sent": True},
-            timeout=10,
-        )
+        await get_async_client().update(TABLE, {"id": f"eq.{reminder_id}"}, {"sent": True})
     except Exception as e:
         logger.error(f"Reminder DB mark_sent error: {e}")
 
 
-def _db_delete(reminder_id: str) -> None:
+async def _db_delete(reminder_id: str) -> None:
     try:
-        requests.delete(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_reminders",
-            headers=_headers(),
-            params={"id": f"eq.{reminder_id}"},
-            timeout=10,
-        )
+        await get_async_client().delete(TABLE, {"id": f"eq.{reminder_id}"})
     except Exception as e:
         logger.error(f"Reminder DB delete error: {e}")
 
@@ -80,12 +59,12 @@ def _schedule_job(reminder_id: str, chat_id: int, message: str, remind_at: datet
             await _app.bot.send_message(chat_id=chat_id, text=f"⏰ 提醒：{message}")
         _reminders.pop(reminder_id, None)
         if _use_supabase:
-            _db_mark_sent(reminder_id)
+            await _db_mark_sent(reminder_id)
 
     get_scheduler().add_job(_send, "date", run_date=remind_at, id=reminder_id, replace_existing=True)
 
 
-def add_reminder(chat_id: int, message: str, remind_at: datetime) -> str:
+async def add_reminder(chat_id: int, message: str, remind_at: datetime) -> str:
     reminder_id = str(uuid.uuid4())[:8]
     _reminders[reminder_id] = {
         "id": reminder_id,
@@ -94,27 +73,22 @@ def add_reminder(chat_id: int, message: str, remind_at: datetime) -> str:
         "chat_id": chat_id,
     }
     if _use_supabase:
-        _db_insert(reminder_id, chat_id, message, remind_at)
+        await _db_insert(reminder_id, chat_id, message, remind_at)
     _schedule_job(reminder_id, chat_id, message, remind_at)
     logger.info(f"Reminder {reminder_id} set for {remind_at} (chat {chat_id})")
     return reminder_id
 
 
-def list_reminders(chat_id: int) -> list[dict]:
+async def list_reminders(chat_id: int) -> list[dict]:
     if _use_supabase:
         try:
             now_iso = datetime.now(timezone.utc).isoformat()
-            r = requests.get(
-                f"{config.SUPABASE_URL}/rest/v1/secretary_reminders",
-                headers=_headers(),
-                params={
-                    "chat_id": f"eq.{chat_id}",
-                    "sent": "eq.false",
-                    "remind_at": f"gt.{now_iso}",
-                    "order": "remind_at.asc",
-                },
-                timeout=10,
-            )
+            r = await get_async_client().select(TABLE, {
+                "chat_id": f"eq.{chat_id}",
+                "sent": "eq.false",
+                "remind_at": f"gt.{now_iso}",
+                "order": "remind_at.asc",
+            })
             if r.status_code == 200:
                 return [
                     {
@@ -130,7 +104,7 @@ def list_reminders(chat_id: int) -> list[dict]:
     return [r for r in _reminders.values() if r["chat_id"] == chat_id]
 
 
-def cancel_reminder(reminder_id: str) -> bool:
+async def cancel_reminder(reminder_id: str) -> bool:
     if reminder_id not in _reminders:
         return False
     try:
@@ -139,27 +113,22 @@ def cancel_reminder(reminder_id: str) -> bool:
         pass
     del _reminders[reminder_id]
     if _use_supabase:
-        _db_delete(reminder_id)
+        await _db_delete(reminder_id)
     return True
 
 
-def load_pending_reminders() -> None:
+async def load_pending_reminders() -> None:
     """Load unsent future reminders from Supabase and reschedule them.
     Call once at bot startup after set_app()."""
     if not _use_supabase:
         return
     try:
         now_iso = datetime.now(timezone.utc).isoformat()
-        r = requests.get(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_reminders",
-            headers=_headers(),
-            params={
-                "sent": "eq.false",
-                "remind_at": f"gt.{now_iso}",
-                "order": "remind_at.asc",
-            },
-            timeout=10,
-        )
+        r = await get_async_client().select(TABLE, {
+            "sent": "eq.false",
+            "remind_at": f"gt.{now_iso}",
+            "order": "remind_at.asc",
+        })
         if r.status_code != 200:
             logger.error(f"Failed to load pending reminders: {r.status_code}")
             return
@@ -1,8 +1,8 @@
 import logging
-import requests
 import uuid
 
 import config
+from utils.postgrest import get_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,15 +17,9 @@ class TaskStore:
         self._memory = []  # fallback
         self._use_supabase = bool(config.SUPABASE_URL and config.SUPABASE_KEY)
 
-    def _headers(self):
-        return {
-            "apikey": config.SUPABASE_KEY,
-            "Authorization": f"Bearer {config.SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
+    TABLE = "secretary_tasks"
 
-    def add(self, title: str, due_date: str = None) -> str:
+    async def add(self, title: str, due_date: str = None) -> str:
         if self._use_supabase:
             try:
                 data = {"title": title, "completed": False}
@@ -33,10 +27,7 @@ class TaskStore:
                     data["due_date"] = due_date
                 if self._chat_id:
                     data["chat_id"] = self._chat_id
-                r = requests.post(
-                    f"{config.SUPABASE_URL}/rest/v1/secretary_tasks",
-                    headers=self._headers(), json=data
-                )
+                r = await get_async_client().insert(self.TABLE, data, prefer="return=representation")
                 if r.status_code in (200, 201):
                     row = r.json()[0] if isinstance(r.json(), list) else r.json()
                     return f"✅ 任務已新增：{title}（ID: {str(row.get('id',''))[:8]}）"
@@ -48,7 +39,7 @@ class TaskStore:
             self._memory.append({"id": task_id, "title": title, "due_date": due_date, "completed": False})
             return f"✅ 任務已新增：{title}（ID: {task_id}）"
 
-    def list_tasks(self, show_completed: bool = False) -> str:
+    async def list_tasks(self, show_completed: bool = False) -> str:
         if self._use_supabase:
             try:
                 params = {"order": "created_at.asc"}
@@ -56,10 +47,7 @@ class TaskStore:
                     params["completed"] = "eq.false"
                 if self._chat_id:
                     params["chat_id"] = f"eq.{self._chat_id}"
-                r = requests.get(
-                    f"{config.SUPABASE_URL}/rest/v1/secretary_tasks",
-                    headers=self._headers(), params=params
-                )
+                r = await get_async_client().select(self.TABLE, params)
                 items = r.json() if r.status_code == 200 else []
             except Exception as e:
                 return f"查詢失敗：{e}"
@@ -75,7 +63,7 @@ class TaskStore:
             lines.append(f"  {check} [{str(t['id'])[:8]}] {t['title']}{due}")
         return "\n".join(lines)
 
-    def _find_task_id(self, task_id: str) -> str | None:
+    async def _find_task_id(self, task_id: str) -> str | None:
         """Find full UUID by partial UUID prefix or title keyword."""
         import re
         params = {"completed": "eq.false", "select": "id,title"}
@@ -86,10 +74,7 @@ class TaskStore:
             params["id"] = f"eq.{task_id}" if len(task_id) == 36 else None
             if params["id"] is None:
                 del params["id"]
-        r = requests.get(
-            f"{config.SUPABASE_URL}/rest/v1/secretary_tasks",
-            headers=self._headers(), params=params
-        )
+        r = await get_async_client().select(self.TABLE, params)
         if r.status_code != 200:
             return None
         rows = r.json()
@@ -102,18 +87,14 @@ class TaskStore:
                 return str(row["id"])
         return None
 
-    def complete(self, task_id: str) -> str:
+    async def complete(self, task_id: str) -> str:
         if self._use_supabase:
             try:
-                full_id = self._find_task_id(task_id)
+                full_id = await self._find_task_id(task_id)
                 if not full_id:
                     return f"找不到任務：{task_id}"
-                r = requests.patch(
-                    f"{config.SUPABASE_URL}/rest/v1/secretary_tasks",
-                    headers=self._headers(),
-                    params={"id": f"eq.{full_id}"},
-                    json={"completed": True}
-                )
+                r = await get_async_client().update(self.TABLE, {"id": f"eq.{full_id}"}, {"completed": True},
+                                                    prefer="return=representation")
                 if r.status_code in (200, 204):
                     return f"✅ 任務已標記完成：{task_id}"
                 return f"更新失敗：{r.status_code} {r.text}"
@@ -126,17 +107,13 @@ class TaskStore:
                     return f"✅ 任務已完成：{t['title']}"
             return "找不到該任務"
 
-    def delete(self, task_id: str) -> str:
+    async def delete(self, task_id: str) -> str:
         if self._use_supabase:
             try:
-                full_id = self._find_task_id(task_id)
+                full_id = await self._find_task_id(task_id)
                 if not full_id:
                     return f"找不到任務：{task_id}"
-                r = requests.delete(
-                    f"{config.SUPABASE_URL}/rest/v1/secretary_tasks",
-                    headers=self._headers(),
-                    params={"id": f"eq.{full_id}"}
-                )
+                r = await get_async_client().delete(self.TABLE, {"id": f"eq.{full_id}"})
                 if r.status_code in (200, 204):
                     return f"🗑️ 任務已刪除：{task_id}"
                 return f"刪除失敗：{r.status_code} {r.text}"
@@ -3,6 +3,7 @@ import requests
 from datetime import datetime, timezone, timedelta
 
 import config
+from utils.postgrest import get_async_client
 
 logger = logging.getLogger(__name__)
 HKT = timezone(timedelta(hours=8))
@@ -26,7 +27,7 @@ async def get_team_status_raw() -> str:
     lines.append("")
 
     # Latest alert count from Supabase
-    alert_summary = _get_alert_summary()
+    alert_summary = await _get_alert_summary()
     lines.append(alert_summary)
 
     return "\n".join(lines)
@@ -73,17 +74,15 @@ def _check_github_workflow(workflow_name: str) -> str:
         return f"  ⚠️ 查詢失敗：{e}"
 
 
-def _get_alert_summary() -> str:
-    if not config.SUPABASE_URL or not config.SUPABASE_KEY:
+async def _get_alert_summary() -> str:
+    db = get_async_client()
+    if not db:
         return "⚠️ Supabase 未設定"
     try:
-        headers = {"apikey": config.SUPABASE_KEY, "Authorization": f"Bearer {config.SUPABASE_KEY}"}
         today = datetime.now(HKT).strftime("%Y-%m-%d")
-        r = requests.get(
-            f"{config.SUPABASE_URL}/rest/v1/whale_alerts",
-            headers=headers,
-            params={"created_at": f"gte.{today}T00:00:00+08:00", "select": "source,ticker"}
-        )
+        # Backfilled Form 144 / 8-K rows (action "...（回填）") are history, not alerts
+        r = await db.select("whale_alerts", {"created_at": f"gte.{today}T00:00:00+08:00", "select": "source,ticker",
+                                             "action": "not.like.*（回填）"})
         if r.status_code != 200:
             return f"⚠️ Supabase 查詢失敗：{r.status_code}"
         data = r.json()
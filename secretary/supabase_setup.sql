@@ -19,6 +19,7 @@ CREATE TABLE IF NOT EXISTS whale_alerts (
 
 CREATE INDEX IF NOT EXISTS idx_whale_alerts_created_at ON whale_alerts(created_at);
 CREATE INDEX IF NOT EXISTS idx_whale_alerts_ticker     ON whale_alerts(ticker);
+-- Then run migrations/001_claim_alert.sql (atomic dedup-and-insert RPC used by the engines)
 
 -- Creates the secretary_tasks table
 
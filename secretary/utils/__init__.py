@@ -0,0 +1,7 @@
+# Shared modules from the repo-root utils/ (postgrest.py). The image copies them in here;
+# in a checkout they are picked up from ../utils.
+import os as _os
+
+_shared = _os.path.join(_os.path.dirname(_os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))), 'utils')
+if _os.path.isdir(_shared):
+    __path__.append(_shared)
@@ -0,0 +1,138 @@
+"""Local stand-in for the Finnhub trades websocket (wss://ws.finnhub.io), stdlib only.
+
+Accepts {"type": "subscribe"|"unsubscribe", "symbol": ...} like the real feed and pushes
+random-walk {"type": "trade", "data": [{"s", "p", "t", "v"}]} messages for every subscribed
+symbol, plus periodic {"type": "ping"}. Point the radar at it with
+
+    python tools/fake_finnhub_ws.py --port 8765 &
+    FINNHUB_WS_URL=ws://127.0.0.1:8765 python radar.py --daemon
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+async def handshake(reader, writer):
+    request = await reader.readuntil(b"\r\n\r\n")
+    headers = {}
+    for line in request.decode("latin-1").split("\r\n")[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+    writer.write(
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+    await writer.drain()
+
+
+def frame(payload, opcode=0x1):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def read_frame(reader):
+    """(opcode, payload) of one client frame (clients always mask)."""
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b2 & 0x80 else b"\0\0\0\0"
+    data = await reader.readexactly(n)
+    return b1 & 0x0F, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+
+class FakeFinnhub:
+    def __init__(self, interval):
+        self.interval = interval
+        self.prices = {}
+
+    def tick(self, symbol):
+        price = self.prices.get(symbol) or random.uniform(20, 500)
+        price = round(price * (1 + random.gauss(0, 0.001)), 2)
+        self.prices[symbol] = price
+        return {"s": symbol, "p": price, "t": int(time.time() * 1000), "v": random.randint(1, 500)}
+
+    async def handle(self, reader, writer):
+        try:
+            await handshake(reader, writer)
+        except (asyncio.IncompleteReadError, KeyError):
+            writer.close()
+            return
+        symbols = set()
+        pusher = asyncio.create_task(self.push(writer, symbols))
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(frame(b"", 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(frame(payload, 0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                msg = json.loads(payload)
+                if msg.get("type") == "subscribe":
+                    symbols.add(msg["symbol"])
+                elif msg.get("type") == "unsubscribe":
+                    symbols.discard(msg["symbol"])
+                print(f"{msg.get('type')} {msg.get('symbol')} -> {sorted(symbols)}")
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            pusher.cancel()
+            writer.close()
+
+    async def push(self, writer, symbols):
+        n = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            n += 1
+            if symbols:
+                msg = {"type": "trade", "data": [self.tick(s) for s in sorted(symbols)]}
+            elif n % 10 == 0:
+                msg = {"type": "ping"}
+            else:
+                continue
+            writer.write(frame(json.dumps(msg).encode()))
+            await writer.drain()
+
+
+async def serve(host, port, interval):
+    server = await asyncio.start_server(FakeFinnhub(interval).handle, host, port)
+    print(f"Fake Finnhub websocket on ws://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--interval", type=float, default=0.5, help="seconds between trade bursts")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
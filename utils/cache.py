@@ -0,0 +1,17 @@
+import os
+
+# Local state directory (persisted between Actions runs by actions/cache, a volume on Railway)
+CACHE_DIR = os.environ.get('RADAR_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'))
+
+
+def cache_path(name):
+    return os.path.join(CACHE_DIR, name)
+
+
+def atomic_write(path, data):
+    """Write bytes to `path` via a temp file + rename so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
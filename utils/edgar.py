@@ -0,0 +1,92 @@
+import os
+import re
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
+
+from utils import metrics
+from utils.ratelimit import TokenBucket
+
+SEC_HEADERS = {'User-Agent': 'WhaleRadarBot Admin@kuafuorhk.com'}
+SEC_TIMEOUT = 15
+# SEC fair-access policy: max 10 requests/second per client, shared by every engine in the process
+SEC_MAX_RPS = float(os.environ.get('SEC_MAX_RPS', 10))
+SEC_FETCH_WORKERS = int(os.environ.get('SEC_FETCH_WORKERS', 6))
+STREAM_CHUNK = 16 * 1024
+
+_bucket = TokenBucket(SEC_MAX_RPS)
+_session = requests.Session()
+_session.headers.update(SEC_HEADERS)
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=SEC_FETCH_WORKERS + 2))
+
+
+def sec_get(url, **kwargs):
+    """Rate-limited GET over the pooled keep-alive session."""
+    _bucket.acquire()
+    kwargs.setdefault('timeout', SEC_TIMEOUT)
+    return _session.get(url, **kwargs)
+
+
+def filing_txt_url(link):
+    return link.replace('-index.htm', '.txt')
+
+
+def _read_until(resp, max_bytes, markers):
+    """Read a streamed body until any marker (inclusive) or max_bytes, whichever comes first."""
+    buf = bytearray()
+    overlap = max((len(m) for m in markers), default=1) - 1
+    for chunk in resp.iter_content(STREAM_CHUNK):
+        scan_from = max(0, len(buf) - overlap)
+        buf += chunk
+        hits = [i + len(m) for m in markers for i in [buf.find(m, scan_from)] if i >= 0]
+        if hits:
+            del buf[min(hits):]
+            break
+        if max_bytes and len(buf) >= max_bytes:
+            del buf[max_bytes:]
+            break
+    return bytes(buf)
+
+
+def fetch_filing(link, max_bytes=None, until=None):
+    """Download the full submission .txt behind a feed `-index.htm` link. None on failure.
+
+    With `max_bytes` and/or `until` (bytes marker or tuple of markers) the body is streamed and
+    the download stops as soon as the engine has what it needs; the rest of a multi-MB submission
+    (exhibits, XBRL, uuencoded graphics) is never transferred."""
+    markers = (until,) if isinstance(until, bytes) else tuple(until or ())
+    try:
+        with sec_get(filing_txt_url(link), stream=True) as resp:
+            if resp.status_code != 200:
+                print(f"  ⚠️ SEC fetch {resp.status_code}: {link}")
+                return None
+            if not max_bytes and not markers:
+                metrics.count("bytes_fetched", len(resp.content))
+                return resp.text
+            body = _read_until(resp, max_bytes, markers)
+            metrics.count("bytes_fetched", len(body))
+            return body.decode(resp.encoding or 'utf-8', errors='replace')
+    except Exception as e:
+        print(f"  ⚠️ SEC fetch error: {e}")
+        return None
+
+
+def fetch_filings(links, workers=SEC_FETCH_WORKERS, max_bytes=None, until=None):
+    """Fetch many filings concurrently (bounded by `workers` and the shared rate limit).
+    Returns {link: text or None} in input order."""
+    links = list(dict.fromkeys(links))
+    if not links:
+        return {}
+    fetch = metrics.propagate(partial(fetch_filing, max_bytes=max_bytes, until=until))
+    metrics.count("filings_fetched", len(links))
+    with metrics.stage("fetch"), ThreadPoolExecutor(max_workers=min(workers, len(links))) as pool:
+        return dict(zip(links, pool.map(fetch, links)))
+
+
+def parse_title_cik(title):
+    """'4 - Apple Inc. (0000320193) (Issuer)' -> (320193, 'Issuer'); (None, None) if absent."""
+    m = re.search(r'\((\d{1,10})\)\s*\(([^)]+)\)\s*$', title or "")
+    if not m:
+        return None, None
+    return int(m.group(1)), m.group(2).strip()
@@ -0,0 +1,220 @@
+import json
+import os
+from datetime import datetime, timezone, timedelta
+
+from utils import metrics
+from utils.cache import cache_path, atomic_write
+from utils.edgar import sec_get
+from utils.sec_parse import parse_atom
+
+FEED_URL = 'https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type={type}&owner={owner}&count={count}&start={start}&output=atom'
+PAGE_SIZE = 100
+MAX_PAGES = int(os.environ.get('SEC_FEED_MAX_PAGES', 10))
+# Runs a filing that fails to download or process is retried on before it is skipped
+FILING_MAX_ATTEMPTS = int(os.environ.get('SEC_FILING_MAX_ATTEMPTS', 5))
+
+
+class FeedCursor:
+    """Per-engine high-water mark over a getcurrent feed.
+
+    EDGAR `updated` stamps have one-second resolution and several filings can share one, so the
+    cursor keeps the newest timestamp handled plus every accession already handled at it.
+    A filing that failed to download or process does not hold the mark back: it is kept in
+    `failures` with its feed timestamp and selected again on the next runs until it succeeds or
+    has failed FILING_MAX_ATTEMPTS times."""
+
+    def __init__(self, name, updated=None, accessions=(), failures=None):
+        self.name = name
+        self.updated = updated
+        self.accessions = set(accessions)
+        # accession -> {"runs": failed runs so far, "updated": feed timestamp (ISO)}
+        self.failures = {a: f for a, f in (failures or {}).items() if isinstance(f, dict)}
+        self.failed = set()  # accessions that failed in this run
+        self.seen = None  # newest feed timestamp read on this cursor's behalf in this run
+
+    @classmethod
+    def load(cls, name):
+        try:
+            with open(cache_path(f'cursors/{name}.json')) as f:
+                d = json.load(f)
+            return cls(name, datetime.fromisoformat(d['updated']), d.get('accessions', []), d.get('failures'))
+        except FileNotFoundError:
+            return cls(name)
+        except Exception as e:
+            print(f"⚠️ {name} cursor unreadable, starting fresh: {e}")
+            return cls(name)
+
+    def save(self):
+        if self.updated is None:
+            return
+        atomic_write(cache_path(f'cursors/{self.name}.json'), json.dumps({
+            "updated": self.updated.isoformat(),
+            "accessions": sorted(self.accessions),
+            "failures": self.failures,
+        }).encode())
+
+    def horizon(self, first_run_minutes):
+        """Oldest feed timestamp still worth reading: the mark, or the oldest filing waiting for a
+        retry. With no saved cursor (first run / cold cache) that is the last `first_run_minutes`
+        of the feed."""
+        if self.updated is None:
+            return datetime.now(timezone.utc) - timedelta(minutes=first_run_minutes)
+        return min([self.updated] + [datetime.fromisoformat(f['updated']) for f in self.failures.values()])
+
+    def select(self, entries, first_run_minutes):
+        horizon = self.horizon(first_run_minutes)
+        return [e for e in entries if e.updated is not None and e.updated >= horizon and self.is_new(e)]
+
+    def is_new(self, entry):
+        if self.updated is None or entry.updated > self.updated or entry.accession in self.failures:
+            return True
+        return entry.updated == self.updated and entry.accession not in self.accessions
+
+    def advance(self, entry):
+        self.failures.pop(entry.accession, None)
+        if entry.updated is None:
+            return
+        if self.updated is None or entry.updated > self.updated:
+            self.updated = entry.updated
+            self.accessions = {entry.accession}
+        elif entry.updated == self.updated:
+            self.accessions.add(entry.accession)
+
+    def advance_all(self, entries):
+        """Advance over `entries`, except the filings that failed in this run."""
+        for e in entries:
+            if e.accession not in self.failed:
+                self.advance(e)
+
+    def catch_up(self):
+        """Move the mark up to the newest timestamp read in this run once the engine has handled
+        its whole window: a quiet engine must not keep the shared read horizon behind."""
+        if self.seen is not None and (self.updated is None or self.seen > self.updated):
+            self.updated = self.seen
+            self.accessions = set()
+
+    def fail(self, entry):
+        """Record a failed fetch / processing of `entry`: it is selected again next run. After
+        FILING_MAX_ATTEMPTS failed runs it is given up on and handled like any finished filing."""
+        n = self.failures.get(entry.accession, {}).get('runs', 0) + 1
+        if n >= FILING_MAX_ATTEMPTS:
+            print(f"⚠️ {self.name}: giving up on {entry.accession} after {n} failed runs")
+            self.failures.pop(entry.accession, None)
+            return
+        self.failed.add(entry.accession)
+        self.failures[entry.accession] = {"runs": n, "updated": entry.updated.isoformat()}
+        print(f"  ⏳ {entry.accession} failed ({n}/{FILING_MAX_ATTEMPTS}), retrying next run")
+
+
+def drain(cursor, window, pending, process, max_alerts):
+    """Run `process(entry)` over `pending` in feed order and save `cursor`.
+
+    `process` returns the alerts it sent, or None / raises when the filing could not be
+    downloaded or processed; that filing is recorded in `cursor.failures` and the rest of the
+    window goes on. Once `max_alerts` are sent the remaining filings stay ahead of the cursor for
+    the next run; otherwise the cursor advances over the whole `window` (gated-out entries
+    included) and up to the newest feed timestamp read. Returns the alerts sent."""
+    found = 0
+    for entry in pending:
+        try:
+            sent = process(entry)
+        except Exception as e:
+            print(f"  ⚠️ {entry.accession}: {e}")
+            sent = None
+        if sent is None:
+            cursor.fail(entry)
+            continue
+        cursor.advance(entry)
+        found += sent
+        if found >= max_alerts:
+            break
+    else:
+        cursor.advance_all(window)
+        cursor.catch_up()
+    cursor.save()
+    return found
+
+
+# Feed URL -> (ETag, Last-Modified, parsed entries) of the last 200, for conditional polling
+_validators = {}
+
+
+def _get_page(url, conditional):
+    """Parsed entries of one feed page. On 304 Not Modified the entries of the last 200 are
+    returned again: engines whose cursors are behind (alert cap, failed filing) still drain them."""
+    headers = {}
+    etag, last_modified, cached = _validators.get(url, (None, None, None)) if conditional else (None, None, None)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    with metrics.stage("feed"):
+        resp = sec_get(url, headers=headers)
+    if resp.status_code == 304 and cached is not None:
+        metrics.count("feed_not_modified")
+        return cached
+    if resp.status_code != 200:
+        print(f"⚠️ SEC feed {resp.status_code}: {url}")
+        return []
+    metrics.count("feed_bytes", len(resp.content))
+    with metrics.stage("parse"):
+        entries = parse_atom(resp.content)
+    if conditional:
+        _validators[url] = (resp.headers.get('ETag'), resp.headers.get('Last-Modified'), entries)
+    return entries
+
+
+def log_alert_latency(entry):
+    """Print seconds from the filing's feed timestamp to now, the filing-to-Telegram metric."""
+    if entry.updated is not None:
+        print(f"  ⏱️ Filing → Telegram: {(datetime.now(timezone.utc) - entry.updated).total_seconds():.0f}s")
+
+
+def read_entries(form_type, owner, horizon, label):
+    """Every feed entry stamped at or after `horizon`, oldest first.
+
+    Pages through the feed with start= until it passes the horizon, so bursts bigger than one
+    page are not dropped. The feed is only roughly newest first (stamps a few seconds apart can
+    swap), so every page is filtered whole and paging stops once a page reaches past the horizon."""
+    found = []
+    for page in range(MAX_PAGES):
+        # Only the first page is polled conditionally; deeper pages are read only when a cursor
+        # is behind all of it
+        entries = _get_page(FEED_URL.format(type=form_type, owner=owner, count=PAGE_SIZE, start=page * PAGE_SIZE),
+                            conditional=page == 0)
+        stamped = [e for e in entries if e.updated is not None]
+        found.extend(e for e in stamped if e.updated >= horizon)
+        if len(entries) < PAGE_SIZE or (stamped and min(e.updated for e in stamped) < horizon):
+            break
+    else:
+        print(f"⚠️ {label}: feed backlog exceeds {MAX_PAGES} pages; oldest entries skipped")
+
+    found.reverse()
+    found.sort(key=lambda e: e.updated)
+    return found
+
+
+def read_feed(form_type, owner, cursor, first_run_minutes=15):
+    """Every entry of one form's feed newer than `cursor`, oldest first."""
+    entries = read_entries(form_type, owner, cursor.horizon(first_run_minutes), cursor.name)
+    if entries:
+        cursor.seen = entries[-1].updated
+    return cursor.select(entries, first_run_minutes)
+
+
+def read_current(routes):
+    """One pass over the combined all-forms feed on behalf of several engines.
+
+    `routes` maps engine name -> (cursor, accepts, first_run_minutes), where `accepts(category)`
+    picks the engine's forms. The feed is fetched and parsed once, down to the oldest cursor,
+    and the result maps engine name -> its new entries, oldest first. Every cursor also learns
+    the newest timestamp read, so an engine with nothing routed to it still moves forward."""
+    horizon = min(cursor.horizon(minutes) for cursor, _, minutes in routes.values())
+    entries = read_entries('', 'include', horizon, 'current')
+    if entries:
+        for cursor, _, _ in routes.values():
+            cursor.seen = entries[-1].updated
+    return {
+        name: cursor.select([e for e in entries if accepts(e.category)], minutes)
+        for name, (cursor, accepts, minutes) in routes.items()
+    }
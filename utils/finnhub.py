@@ -1,38 +1,170 @@
+import json
 import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from utils import metrics, quote_stream
+from utils.cache import cache_path, atomic_write
+from utils.ratelimit import TokenBucket
 
 FINNHUB_API_KEY = os.environ.get('FINNHUB_API_KEY')
+FINNHUB_URL = "https://finnhub.io/api/v1"
+FINNHUB_TIMEOUT = 10
+# Free tier: 60 calls/minute, shared by everything in the process
+FINNHUB_PER_MINUTE = float(os.environ.get('FINNHUB_PER_MINUTE', 60))
+FINNHUB_BURST = min(5, FINNHUB_PER_MINUTE / 2)
+FINNHUB_WORKERS = 8
+# Trading sessions are US/Eastern days: a UTC host date flips at 8pm ET, mid after-hours
+ET = ZoneInfo('America/New_York')
+QUOTE_TTL = float(os.environ.get('FINNHUB_QUOTE_TTL_SECONDS', 30))
+# Sector / market cap barely move: profiles live on disk for a week
+PROFILE_TTL = float(os.environ.get('FINNHUB_PROFILE_TTL_HOURS', 168)) * 3600
+PROFILE_FILE = cache_path('finnhub_profiles.json')
 
+# A full burst plus one minute of refill never exceeds the per-minute quota; a small burst keeps
+# the steady rate close to one call per second
+_bucket = TokenBucket((FINNHUB_PER_MINUTE - FINNHUB_BURST) / 60, capacity=FINNHUB_BURST)
+_session = requests.Session()
 
-def get_stock_quote(ticker):
-    if not FINNHUB_API_KEY or ticker == "N/A":
-        return "N/A", "N/A", 0, 0
+_quotes = {}     # symbol -> (monotonic time, quote dict)
+# symbol -> (ET session date, its previous close, its close or None while still trading) from the
+# last REST quote, to price streamed trades
+_prev_close = {}
+_profiles = None  # symbol -> {"fetched_at": epoch, "data": profile dict}; loaded from disk on first use
+_lock = threading.Lock()
+
+
+def _get(path, symbol):
+    """Rate-limited GET of one Finnhub endpoint; the JSON body, or None on failure."""
     try:
-        resp = requests.get(f"https://finnhub.io/api/v1/quote?symbol={ticker}&token={FINNHUB_API_KEY}")
+        with metrics.stage("finnhub"):
+            _bucket.acquire()
+            resp = _session.get(f"{FINNHUB_URL}/{path}", params={"symbol": symbol, "token": FINNHUB_API_KEY},
+                                timeout=FINNHUB_TIMEOUT)
         if resp.status_code == 200:
-            d = resp.json()
-            price, change = d.get('c', 0), d.get('dp', 0)
-            if price and price > 0:
-                sign = "+" if change > 0 else ""
-                icon = "\U0001f7e2" if change > 0 else ("\U0001f534" if change < 0 else "\u26aa")
-                return f"${price:.2f}", f"{icon} {sign}{change:.2f}%", price, change
+            return resp.json()
+        print(f"  ⚠️ Finnhub {path} {symbol}: {resp.status_code}")
     except Exception as e:
-        print(f"  ⚠️ Finnhub error: {e}")
+        print(f"  ⚠️ Finnhub {path} error: {e}")
+    return None
+
+
+def _load_profiles():
+    global _profiles
+    if _profiles is None:
+        try:
+            with open(PROFILE_FILE) as f:
+                _profiles = json.load(f)
+        except FileNotFoundError:
+            _profiles = {}
+        except Exception as e:
+            print(f"⚠️ Finnhub profile cache unreadable, starting fresh: {e}")
+            _profiles = {}
+    return _profiles
+
+
+def quote(symbol):
+    """Raw /quote dict (c, d, dp, pc, ...), cached for QUOTE_TTL seconds; {} on failure."""
+    if not FINNHUB_API_KEY or symbol == "N/A":
+        return {}
+    with _lock:
+        hit = _quotes.get(symbol)
+    if hit and time.monotonic() - hit[0] < QUOTE_TTL:
+        return hit[1]
+    data = _get("quote", symbol)
+    if not data:
+        return {}
+    now = datetime.now(ET)
+    session = datetime.fromtimestamp(data['t'], ET).date() if data.get('t') else now.date()
+    closed = now.date() > session or now.hour >= 16
+    with _lock:
+        _quotes[symbol] = (time.monotonic(), data)
+        if data.get('pc'):
+            _prev_close[symbol] = (session, data['pc'], data.get('c') if closed else None)
+    return data
+
+
+def profile(symbol):
+    """Raw /stock/profile2 dict (finnhubIndustry, marketCapitalization, ...), cached on disk
+    for PROFILE_TTL; {} on failure."""
+    if not FINNHUB_API_KEY or symbol == "N/A":
+        return {}
+    with _lock:
+        hit = _load_profiles().get(symbol)
+    if hit and time.time() - hit["fetched_at"] < PROFILE_TTL:
+        return hit["data"]
+    data = _get("stock/profile2", symbol)
+    if data is None:
+        return hit["data"] if hit else {}
+    if not data:
+        # Unknown symbol (or one Finnhub has not profiled yet): not worth a week on disk
+        return {}
+    with _lock:
+        profiles = _load_profiles()
+        profiles[symbol] = {"fetched_at": time.time(), "data": data}
+        atomic_write(PROFILE_FILE, json.dumps(profiles).encode())
+    return data
+
+
+def _fan_out(fn, symbols):
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(FINNHUB_WORKERS, len(symbols))) as pool:
+        return dict(zip(symbols, pool.map(metrics.propagate(fn), symbols)))
+
+
+def get_quotes(symbols):
+    """{symbol: quote dict} for many symbols at once, fetched concurrently under the shared limit."""
+    return _fan_out(quote, symbols)
+
+
+def get_profiles(symbols):
+    """{symbol: profile dict} for many symbols at once; cached profiles cost no request."""
+    return _fan_out(profile, symbols)
+
+
+def _streamed_quote(ticker):
+    """(price, change %) from the websocket last-trade table, or None to fall back to REST."""
+    price = quote_stream.last_price(ticker)
+    with _lock:
+        session, prev, close = _prev_close.get(ticker, (None, None, None))
+    today = datetime.now(ET).date()
+    if session is not None and session < today:
+        # Quoted on an earlier session: its close is today's previous close
+        prev = close
+    if price is None or not prev or session is None or session > today:
+        return None
+    return price, (price - prev) / prev * 100
+
+
+def get_stock_quote(ticker):
+    streamed = _streamed_quote(ticker)
+    if streamed:
+        metrics.count("quotes_streamed")
+        price, change = streamed
+    else:
+        d = quote(ticker)
+        price, change = d.get('c', 0), d.get('dp', 0) or 0
+        # Stream it from now on so the next alert on this ticker skips the round trip
+        quote_stream.subscribe(ticker)
+    if price and price > 0:
+        sign = "+" if change > 0 else ""
+        icon = "\U0001f7e2" if change > 0 else ("\U0001f534" if change < 0 else "⚪")
+        return f"${price:.2f}", f"{icon} {sign}{change:.2f}%", price, change
     return "N/A", "N/A", 0, 0
 
 
 def get_company_profile(ticker):
-    if not FINNHUB_API_KEY or ticker == "N/A":
+    d = profile(ticker)
+    if not d:
         return {"sector": "N/A", "industry": "N/A", "marketCap": 0}
-    try:
-        resp = requests.get(f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker}&token={FINNHUB_API_KEY}")
-        if resp.status_code == 200:
-            d = resp.json()
-            return {
-                "sector": d.get('finnhubIndustry', 'N/A'),
-                "industry": d.get('finnhubIndustry', 'N/A'),
-                "marketCap": d.get('marketCapitalization', 0)
-            }
-    except Exception as e:
-        print(f"  ⚠️ Finnhub profile error: {e}")
-    return {"sector": "N/A", "industry": "N/A", "marketCap": 0}
+    return {
+        "sector": d.get('finnhubIndustry', 'N/A'),
+        "industry": d.get('finnhubIndustry', 'N/A'),
+        "marketCap": d.get('marketCapitalization', 0)
+    }
@@ -0,0 +1,18 @@
+import os
+
+from utils.lazy import lazy_import, once
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+genai = lazy_import('google.genai')
+types = lazy_import('google.genai.types')
+
+
+@once
+def get_client():
+    """One client per process, shared by every engine; built on first use (None without a key)."""
+    if not GEMINI_API_KEY:
+        return None
+    client = genai.Client(api_key=GEMINI_API_KEY)
+    print("Gemini 3.1 Pro ready")
+    return client
@@ -0,0 +1,44 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a heavy module (pandas, yfinance, google.genai, ...) that imports it on first
+    attribute access. Most runs never chart or call the LLM and so never pay the import."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def once(factory):
+    """Memoize a zero-argument factory (e.g. an API client) so it is built on first call, once."""
+    lock = threading.Lock()
+    result = []
+
+    def get():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(factory())
+        return result[0]
+    return get
@@ -0,0 +1,216 @@
+"""Per-run stage timings and counters for the SEC engines.
+
+    with metrics.run("form4"):            # one record per engine run
+        with metrics.stage("fetch"):      # seconds + calls per stage, summed over the run
+            ...
+        metrics.count("skip.dedup", 12)   # counters: bytes fetched, gate skips, LLM tokens
+
+The current run lives in a context variable, so concurrent engines (radar's thread pool) keep
+separate records, and shared helpers (edgar, finnhub, postgrest, ...) instrument themselves
+without being passed anything; outside a run every call is a no-op. When a run ends it appends
+one JSON line to the metrics log and prints a one-line summary.
+
+    python -m utils.metrics [--engine NAME] [--last N]   # p50 / p95 per stage across runs
+"""
+import argparse
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils.cache import cache_path
+
+METRICS_FILE = os.environ.get('RADAR_METRICS_FILE') or cache_path('metrics.jsonl')
+# Keep the log bounded: past this size the oldest half is dropped
+METRICS_MAX_BYTES = 4 * 1024 * 1024
+
+_current = contextvars.ContextVar('metrics_run', default=None)
+_write_lock = threading.Lock()
+
+
+class Run:
+    """Stage timings and counters of one engine run; safe to update from several threads."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.started = time.monotonic()
+        self.ts = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.stages = defaultdict(lambda: [0.0, 0])  # stage -> [seconds, calls]
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            s = self.stages[name]
+            s[0] += seconds
+            s[1] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def record(self, ok=True):
+        with self._lock:
+            return {
+                "ts": self.ts,
+                "engine": self.engine,
+                "ok": ok,
+                "seconds": round(time.monotonic() - self.started, 3),
+                "stages": {k: {"seconds": round(v[0], 3), "calls": v[1]} for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def run(engine):
+    """Collect metrics for one engine run; writes the JSON line and prints the summary on exit."""
+    r = Run(engine)
+    token = _current.set(r)
+    ok = False
+    try:
+        yield r
+        ok = True
+    finally:
+        _current.reset(token)
+        record = r.record(ok)
+        print(summary(record))
+        _append(record)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block under `name` in the current run (no-op outside a run)."""
+    r = _current.get()
+    if r is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        r.add_time(name, time.monotonic() - start)
+
+
+def count(name, n=1):
+    r = _current.get()
+    if r is not None and n:
+        r.count(name, n)
+
+
+def count_tokens(response):
+    """Add a Gemini response's usage_metadata to the llm.* token counters."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    count("llm.prompt_tokens", getattr(usage, 'prompt_token_count', 0) or 0)
+    count("llm.output_tokens", getattr(usage, 'candidates_token_count', 0) or 0)
+    count("llm.thinking_tokens", getattr(usage, 'thoughts_token_count', 0) or 0)
+
+
+def propagate(fn):
+    """Wrap `fn` so each call, e.g. on a thread pool worker, reports into the caller's run."""
+    ctx = contextvars.copy_context()
+    return lambda *a, **kw: ctx.copy().run(fn, *a, **kw)
+
+
+def _fmt_bytes(n):
+    return f"{n / 1024 / 1024:.1f}MB" if n >= 1024 * 1024 else f"{n / 1024:.0f}KB"
+
+
+def summary(record):
+    """'📈 form4 3.2s | fetch 1.9s×12 · finnhub 0.4s×4 | bytes 340KB · skip.dedup 8'"""
+    stages = sorted(record["stages"].items(), key=lambda kv: -kv[1]["seconds"])
+    parts = [f"{k} {v['seconds']:.1f}s×{v['calls']}" for k, v in stages]
+    counters = [f"{k} {_fmt_bytes(v) if k.endswith('bytes') else v}" for k, v in sorted(record["counters"].items())]
+    line = f"📈 {record['engine']} {record['seconds']:.1f}s"
+    if parts:
+        line += " | " + " · ".join(parts)
+    if counters:
+        line += " | " + " · ".join(counters)
+    return line
+
+
+def _append(record):
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+            if os.path.exists(METRICS_FILE) and os.path.getsize(METRICS_FILE) > METRICS_MAX_BYTES:
+                with open(METRICS_FILE) as f:
+                    lines = f.readlines()
+                with open(METRICS_FILE, 'w') as f:
+                    f.writelines(lines[len(lines) // 2:])
+            with open(METRICS_FILE, 'a') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"⚠️ Metrics write failed: {e}")
+
+
+def load(path=METRICS_FILE, engine=None, last=None):
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                if engine is None or r.get("engine") == engine:
+                    records.append(r)
+    except FileNotFoundError:
+        return []
+    return records[-last:] if last else records
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+
+def report(records):
+    """p50 / p95 of run time, every stage and every counter, per engine."""
+    by_engine = defaultdict(list)
+    for r in records:
+        by_engine[r["engine"]].append(r)
+    lines = []
+    for engine, runs in sorted(by_engine.items()):
+        failed = sum(1 for r in runs if not r.get("ok", True))
+        lines.append(f"{engine}: {len(runs)} runs ({failed} failed), {runs[0]['ts']} → {runs[-1]['ts']}")
+        rows = [("total", [r["seconds"] for r in runs], "s")]
+        for name in sorted({k for r in runs for k in r["stages"]}):
+            # A run that never entered a stage spent 0s in it
+            rows.append((name, [r["stages"].get(name, {}).get("seconds", 0.0) for r in runs], "s"))
+        for name in sorted({k for r in runs for k in r["counters"]}):
+            rows.append((name, [r["counters"].get(name, 0) for r in runs], ""))
+        lines.append(f"  {'':<22}{'p50':>10}{'p95':>10}{'max':>10}")
+        for name, values, unit in rows:
+            fmt = (lambda v: f"{v:.2f}s") if unit else (lambda v: _fmt_bytes(v) if name.endswith('bytes') else f"{v:g}")
+            lines.append(f"  {name:<22}{fmt(percentile(values, 50)):>10}{fmt(percentile(values, 95)):>10}"
+                         f"{fmt(max(values)):>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="p50/p95 per stage from the radar metrics log")
+    ap.add_argument("--engine", help="only this engine (form4, form144, sc13, 8k, radar)")
+    ap.add_argument("--last", type=int, help="only the last N runs (per filter)")
+    ap.add_argument("--file", default=METRICS_FILE)
+    args = ap.parse_args(argv)
+    records = load(args.file, args.engine, args.last)
+    if not records:
+        print(f"No metrics in {args.file}")
+        return
+    print(report(records))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import io
+import os
+import pickle
+import threading
+import time
+from datetime import date, timedelta
+
+from utils.cache import cache_path, atomic_write
+from utils.lazy import lazy_import
+
+# Imported on first chart: most runs find no whale and never need them
+pd = lazy_import('pandas')
+yf = lazy_import('yfinance')
+mpf = lazy_import('mplfinance')
+
+# Daily bars kept per ticker on disk; charts only ever show the last 180 days
+KEEP_DAYS = 400
+# A ticker re-checked within this window is served from memory with no download at all
+FRESH_SECONDS = float(os.environ.get('OHLC_FRESH_MINUTES', 15)) * 60
+
+_frames = {}  # ticker -> (DataFrame, monotonic time of last download check)
+_lock = threading.Lock()
+
+
+def _path(ticker):
+    return cache_path(f'ohlc/{ticker}.pickle')
+
+
+def _read_disk(ticker):
+    try:
+        with open(_path(ticker), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ OHLC cache for {ticker} unreadable, re-downloading: {e}")
+        return None
+
+
+def _download(ticker, start):
+    df = yf.download(ticker, start=start, end=date.today() + timedelta(days=1), progress=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+    return df[['Open', 'High', 'Low', 'Close', 'Volume']] if not df.empty else df
+
+
+def history(ticker, days=180):
+    """Daily OHLCV for the last `days` calendar days.
+
+    Bars are cached per ticker in memory and on disk; a refresh downloads only from the last
+    stored bar onwards (re-fetching that bar, which may have been a partial session)."""
+    with _lock:
+        cached, checked = _frames.get(ticker, (None, None))
+        if cached is not None and time.monotonic() - checked < FRESH_SECONDS:
+            df = cached
+        else:
+            if cached is None:
+                cached = _read_disk(ticker)
+            if cached is None or cached.empty:
+                df = _download(ticker, date.today() - timedelta(days=days))
+            else:
+                fresh = _download(ticker, cached.index[-1].date())
+                df = pd.concat([cached, fresh])
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+            if not df.empty:
+                df = df[df.index >= pd.Timestamp(date.today() - timedelta(days=KEEP_DAYS))]
+                atomic_write(_path(ticker), pickle.dumps(df))
+            _frames[ticker] = (df, time.monotonic())
+    if df.empty:
+        return df
+    return df[df.index >= pd.Timestamp(date.today() - timedelta(days=days))]
+
+
+def render_chart(df, title, hline=None):
+    """Candlestick chart as an in-memory PNG (BytesIO), ready to upload without touching disk."""
+    buf = io.BytesIO()
+    kwargs = {}
+    if hline is not None:
+        kwargs['hlines'] = dict(hlines=[hline], colors=['r'], linestyle='--')
+    mpf.plot(df, type='candle', style='charles', title=title,
+             savefig=dict(fname=buf, format='png'), **kwargs)
+    buf.seek(0)
+    return buf
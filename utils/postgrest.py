@@ -0,0 +1,222 @@
+"""Pooled Supabase / PostgREST client shared by the radar engines, daily_report and the secretary bot.
+
+One keep-alive session per process (so table calls stop paying a TLS handshake each), auth
+headers set once, a timeout on every call and jittered exponential retry on 5xx / connection
+errors. `AsyncPostgrestClient` is the same API on httpx for code running on an event loop.
+
+Calls return the raw response (`.status_code`, `.json()`, `.text`) so callers keep their own
+status handling; a request that still fails after the retries raises.
+
+Standalone on purpose (stdlib + requests, httpx only for the async client): the secretary
+image ships this one file.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from utils.metrics import stage as _stage  # radar engines; the secretary image has no metrics
+except ImportError:
+    from contextlib import nullcontext as _stage
+
+SUPABASE_URL = os.environ.get('SUPABASE_URL')
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
+SUPABASE_TIMEOUT = float(os.environ.get('SUPABASE_TIMEOUT_SECONDS', 10))
+SUPABASE_RETRIES = int(os.environ.get('SUPABASE_RETRIES', 3))
+SUPABASE_POOL_SIZE = int(os.environ.get('SUPABASE_POOL_SIZE', 10))
+
+# POST is only retried when the caller says the write is idempotent (unique key / upsert)
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'PATCH', 'DELETE'}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff: uniform(0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _headers(prefer=None, headers=None):
+    h = {}
+    if prefer:
+        h['Prefer'] = prefer
+    if headers:
+        h.update(headers)
+    return h
+
+
+class _Base:
+    def __init__(self, url=None, key=None, timeout=SUPABASE_TIMEOUT, retries=SUPABASE_RETRIES):
+        self.url = (url or '').rstrip('/')
+        self.key = key
+        self.timeout = timeout
+        self.retries = retries
+        self.auth = {
+            "apikey": key or '',
+            "Authorization": f"Bearer {key or ''}",
+            "Content-Type": "application/json",
+        }
+
+    def __bool__(self):
+        """False when SUPABASE_URL / SUPABASE_KEY are not configured."""
+        return bool(self.url and self.key)
+
+    def _endpoint(self, table):
+        return f"{self.url}/rest/v1/{table}"
+
+    def _attempts(self, method, retry):
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        return self.retries + 1 if retry else 1
+
+    @staticmethod
+    def _upsert_args(params, on_conflict, prefer):
+        params = dict(params or {})
+        if on_conflict:
+            params['on_conflict'] = on_conflict
+        return params, prefer or "resolution=merge-duplicates,return=minimal"
+
+
+class PostgrestClient(_Base):
+    """Blocking client on a pooled requests.Session; safe to share between threads."""
+
+    def __init__(self, url=None, key=None, timeout=SUPABASE_TIMEOUT, retries=SUPABASE_RETRIES,
+                 pool_size=SUPABASE_POOL_SIZE):
+        super().__init__(url, key, timeout, retries)
+        self.session = requests.Session()
+        self.session.headers.update(self.auth)
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def request(self, method, table, params=None, json=None, prefer=None, headers=None,
+                timeout=None, retry=None):
+        method = method.upper()
+        attempts = self._attempts(method, retry)
+        for attempt in range(attempts):
+            try:
+                with _stage("supabase"):
+                    resp = self.session.request(method, self._endpoint(table), params=params, json=json,
+                                                headers=_headers(prefer, headers),
+                                                timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt + 1 >= attempts:
+                    raise
+            else:
+                if resp.status_code < 500 or attempt + 1 >= attempts:
+                    return resp
+            time.sleep(_backoff(attempt))
+
+    def select(self, table, params=None, **kw):
+        return self.request('GET', table, params=params, **kw)
+
+    def insert(self, table, rows, prefer="return=minimal", **kw):
+        return self.request('POST', table, json=rows, prefer=prefer, **kw)
+
+    def update(self, table, params, data, prefer=None, **kw):
+        return self.request('PATCH', table, params=params, json=data, prefer=prefer, **kw)
+
+    def delete(self, table, params, **kw):
+        return self.request('DELETE', table, params=params, **kw)
+
+    def upsert(self, table, rows, on_conflict=None, params=None, prefer=None, **kw):
+        params, prefer = self._upsert_args(params, on_conflict, prefer)
+        kw.setdefault('retry', True)
+        return self.request('POST', table, params=params, json=rows, prefer=prefer, **kw)
+
+    def rpc(self, fn, args=None, **kw):
+        return self.request('POST', f"rpc/{fn}", json=args or {}, **kw)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncPostgrestClient(_Base):
+    """Same API on httpx.AsyncClient, for the bot's event loop. Bind it to one loop."""
+
+    def __init__(self, url=None, key=None, timeout=SUPABASE_TIMEOUT, retries=SUPABASE_RETRIES,
+                 pool_size=SUPABASE_POOL_SIZE):
+        super().__init__(url, key, timeout, retries)
+        self.pool_size = pool_size
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            import httpx  # only the async side needs it
+            self._client = httpx.AsyncClient(
+                headers=self.auth, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size))
+        return self._client
+
+    async def request(self, method, table, params=None, json=None, prefer=None, headers=None,
+                      timeout=None, retry=None):
+        import httpx
+        method = method.upper()
+        attempts = self._attempts(method, retry)
+        client = self._http()
+        for attempt in range(attempts):
+            try:
+                with _stage("supabase"):
+                    resp = await client.request(method, self._endpoint(table), params=params, json=json,
+                                                headers=_headers(prefer, headers),
+                                                timeout=timeout or self.timeout)
+            except (httpx.TransportError, httpx.TimeoutException):
+                if attempt + 1 >= attempts:
+                    raise
+            else:
+                if resp.status_code < 500 or attempt + 1 >= attempts:
+                    return resp
+            await asyncio.sleep(_backoff(attempt))
+
+    async def select(self, table, params=None, **kw):
+        return await self.request('GET', table, params=params, **kw)
+
+    async def insert(self, table, rows, prefer="return=minimal", **kw):
+        return await self.request('POST', table, json=rows, prefer=prefer, **kw)
+
+    async def update(self, table, params, data, prefer=None, **kw):
+        return await self.request('PATCH', table, params=params, json=data, prefer=prefer, **kw)
+
+    async def delete(self, table, params, **kw):
+        return await self.request('DELETE', table, params=params, **kw)
+
+    async def upsert(self, table, rows, on_conflict=None, params=None, prefer=None, **kw):
+        params, prefer = self._upsert_args(params, on_conflict, prefer)
+        kw.setdefault('retry', True)
+        return await self.request('POST', table, params=params, json=rows, prefer=prefer, **kw)
+
+    async def rpc(self, fn, args=None, **kw):
+        return await self.request('POST', f"rpc/{fn}", json=args or {}, **kw)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide blocking client from SUPABASE_URL / SUPABASE_KEY (falsy when unset)."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = PostgrestClient(SUPABASE_URL, SUPABASE_KEY)
+        return _client
+
+
+def get_async_client():
+    """Process-wide async client from SUPABASE_URL / SUPABASE_KEY (falsy when unset)."""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncPostgrestClient(SUPABASE_URL, SUPABASE_KEY)
+        return _async_client
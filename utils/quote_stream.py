@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import websocket  # websocket-client; optional, the stream stays off without it
+except ImportError:
+    websocket = None
+
+FINNHUB_API_KEY = os.environ.get('FINNHUB_API_KEY')
+FINNHUB_WS_URL = os.environ.get('FINNHUB_WS_URL', 'wss://ws.finnhub.io')
+# Finnhub free tier streams at most 50 symbols per connection
+MAX_SYMBOLS = int(os.environ.get('FINNHUB_STREAM_MAX_SYMBOLS', 50))
+# A last trade older than this is not trusted as "the price" (halted / illiquid / after hours)
+MAX_AGE = float(os.environ.get('FINNHUB_STREAM_MAX_AGE_SECONDS', 300))
+SEED_SYMBOLS = [s for s in os.environ.get('FINNHUB_STREAM_SYMBOLS', '').upper().split(',') if s]
+
+
+class QuoteStream:
+    """Last-trade table fed by the Finnhub trades websocket on a background thread.
+
+    Subscriptions are kept in LRU order and capped at `max_symbols`; the oldest symbol is
+    unsubscribed to make room. Reconnects resubscribe everything."""
+
+    def __init__(self, url, max_symbols=MAX_SYMBOLS):
+        self.url = url
+        self.max_symbols = max_symbols
+        self._symbols = OrderedDict()
+        self._last = {}  # symbol -> (price, monotonic time received)
+        self._lock = threading.Lock()
+        self._ws = None
+        self._thread = None
+
+    def start(self):
+        self._ws = websocket.WebSocketApp(
+            self.url, on_open=self._on_open, on_message=self._on_message, on_error=self._on_error)
+        self._thread = threading.Thread(
+            target=self._ws.run_forever, kwargs={"ping_interval": 30, "reconnect": 5}, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._ws is not None:
+            self._ws.close()
+
+    def _send(self, kind, symbol):
+        try:
+            if self._ws is not None and self._ws.sock and self._ws.sock.connected:
+                self._ws.send(json.dumps({"type": kind, "symbol": symbol}))
+        except Exception as e:
+            print(f"⚠️ Quote stream {kind} {symbol} failed: {e}")
+
+    def _on_open(self, ws):
+        with self._lock:
+            symbols = list(self._symbols)
+        for s in symbols:
+            self._send("subscribe", s)
+        print(f"📶 Quote stream connected ({len(symbols)} symbols)")
+
+    def _on_message(self, ws, message):
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+        if msg.get("type") != "trade":
+            return
+        now = time.monotonic()
+        with self._lock:
+            for trade in msg.get("data") or ():
+                if trade.get("s") and trade.get("p"):
+                    self._last[trade["s"]] = (float(trade["p"]), now)
+
+    def _on_error(self, ws, error):
+        print(f"⚠️ Quote stream error: {error}")
+
+    def subscribe(self, symbol):
+        evicted = None
+        with self._lock:
+            if symbol in self._symbols:
+                self._symbols.move_to_end(symbol)
+                return
+            self._symbols[symbol] = True
+            if len(self._symbols) > self.max_symbols:
+                evicted, _ = self._symbols.popitem(last=False)
+                self._last.pop(evicted, None)
+        if evicted:
+            self._send("unsubscribe", evicted)
+        self._send("subscribe", symbol)
+
+    def last_price(self, symbol, max_age=MAX_AGE):
+        with self._lock:
+            hit = self._last.get(symbol)
+            if symbol in self._symbols:
+                self._symbols.move_to_end(symbol)
+        if hit and time.monotonic() - hit[1] < max_age:
+            return hit[0]
+        return None
+
+
+_stream = None
+
+
+def start(symbols=SEED_SYMBOLS):
+    """Start the process-wide stream (daemon mode). No-op without an API key or websocket-client."""
+    global _stream
+    if _stream is not None:
+        return _stream
+    if websocket is None:
+        print("ℹ️ websocket-client not installed; quotes stay on REST")
+        return None
+    if not FINNHUB_API_KEY and FINNHUB_WS_URL.startswith('wss://ws.finnhub.io'):
+        return None
+    sep = '&' if '?' in FINNHUB_WS_URL else '?'
+    _stream = QuoteStream(f"{FINNHUB_WS_URL}{sep}token={FINNHUB_API_KEY or ''}")
+    for s in symbols:
+        _stream.subscribe(s)
+    _stream.start()
+    return _stream
+
+
+def subscribe(symbol):
+    if _stream is not None and symbol and symbol != "N/A":
+        _stream.subscribe(symbol)
+
+
+def last_price(symbol):
+    """Latest streamed trade price, or None when the stream is off / not subscribed / stale."""
+    if _stream is None:
+        return None
+    return _stream.last_price(symbol)
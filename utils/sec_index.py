@@ -0,0 +1,149 @@
+import os
+import pickle
+import re
+import threading
+import time
+
+from utils.cache import cache_path, atomic_write
+from utils.edgar import sec_get
+
+TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+INDEX_FILE = cache_path('sec_index.pickle')
+MAX_AGE = float(os.environ.get('SEC_INDEX_MAX_AGE_HOURS', 24)) * 3600
+# A failed refresh is not retried before this: lookups keep the stale (or empty) index meanwhile
+RETRY_AFTER = float(os.environ.get('SEC_INDEX_RETRY_MINUTES', 15)) * 60
+
+_NAME_SUFFIXES = {
+    "INC", "INCORPORATED", "CORP", "CORPORATION", "CO", "COMPANY", "LTD", "LIMITED",
+    "PLC", "LLC", "LP", "SA", "NV", "AG", "SE", "HOLDINGS", "THE",
+}
+
+
+def normalize_name(name):
+    """'Alphabet Inc.' / 'ALPHABET INC /DE/' -> 'ALPHABET'"""
+    name = re.sub(r'/[A-Z]{2,3}/?', ' ', (name or "").upper())
+    words = re.sub(r'[^A-Z0-9 ]+', ' ', name.replace('&', ' AND ')).split()
+    while words and words[-1] in _NAME_SUFFIXES:
+        words.pop()
+    if words and words[0] == "THE":
+        words.pop(0)
+    return " ".join(words)
+
+
+class SecIndex:
+    """In-memory CIK <-> ticker <-> company name lookups built from company_tickers.json rows."""
+
+    def __init__(self, rows, etag=None, last_modified=None, fetched_at=0.0):
+        self.rows = rows
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self._by_cik = {}
+        self._by_ticker = {}
+        self._by_name = {}
+        # Rows are ordered by market cap, so the first ticker seen for a CIK is its primary listing
+        for cik, ticker, title in rows:
+            self._by_cik.setdefault(cik, (ticker, title))
+            self._by_ticker.setdefault(ticker, cik)
+            self._by_ticker.setdefault(ticker.replace('-', '.'), cik)
+            self._by_name.setdefault(normalize_name(title), cik)
+
+    def __len__(self):
+        return len(self._by_cik)
+
+    def ticker_for_cik(self, cik):
+        hit = self._by_cik.get(_cik_int(cik))
+        return hit[0] if hit else None
+
+    def name_for_cik(self, cik):
+        hit = self._by_cik.get(_cik_int(cik))
+        return hit[1] if hit else None
+
+    def cik_for_ticker(self, ticker):
+        return self._by_ticker.get((ticker or "").strip().upper())
+
+    def cik_for_name(self, name):
+        return self._by_name.get(normalize_name(name))
+
+    def ticker_for_name(self, name):
+        cik = self.cik_for_name(name)
+        return self.ticker_for_cik(cik) if cik is not None else None
+
+
+def _cik_int(cik):
+    try:
+        return int(str(cik).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_disk():
+    try:
+        with open(INDEX_FILE, 'rb') as f:
+            d = pickle.load(f)
+        return SecIndex(d['rows'], d.get('etag'), d.get('last_modified'), d.get('fetched_at', 0.0))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ SEC index cache unreadable: {e}")
+        return None
+
+
+def _write_disk(index):
+    data = {"rows": index.rows, "etag": index.etag, "last_modified": index.last_modified, "fetched_at": index.fetched_at}
+    atomic_write(INDEX_FILE, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _refresh(cached):
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+    try:
+        resp = sec_get(TICKERS_URL, headers=headers)
+        if resp.status_code == 304 and cached is not None:
+            cached.fetched_at = time.time()
+            _write_disk(cached)
+            return cached
+        if resp.status_code != 200:
+            print(f"⚠️ SEC ticker index refresh failed: {resp.status_code}")
+            return cached
+        rows = [(int(v['cik_str']), v['ticker'].upper(), v.get('title', '')) for v in resp.json().values()]
+        index = SecIndex(rows, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), time.time())
+        _write_disk(index)
+        print(f"Refreshed SEC ticker index: {len(index)} companies")
+        return index
+    except Exception as e:
+        print(f"⚠️ SEC ticker index refresh failed: {e}")
+        return cached
+
+
+_index = None
+_attempted = 0.0  # time of the last refresh attempt
+_lock = threading.Lock()
+
+
+def load():
+    """Process-wide index: on-disk snapshot, conditionally refreshed once it is older than MAX_AGE
+    (re-checked on every call, so a long-running daemon picks up new listings too). After an
+    attempt the refresh waits RETRY_AFTER, so an SEC outage costs one request per interval."""
+    global _index, _attempted
+    with _lock:
+        now = time.time()
+        if _index is None or (now - _index.fetched_at > MAX_AGE and now - _attempted > RETRY_AFTER):
+            cached = _index or _read_disk()
+            if cached is None or now - cached.fetched_at > MAX_AGE:
+                _attempted = now
+                cached = _refresh(cached)
+            _index = cached if cached is not None else SecIndex([])
+        return _index
+
+
+def ticker_for_cik(cik, default="N/A"):
+    return load().ticker_for_cik(cik) or default
+
+
+def ticker_for_name(name, default="N/A"):
+    return load().ticker_for_name(name) or default
@@ -0,0 +1,354 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from lxml import etree, html as lxml_html
+
+from utils.edgar import parse_title_cik
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+_ACCESSION_RE = re.compile(r'\d{10}-\d{2}-\d{6}')
+_EDGAR_TZ = ZoneInfo('America/New_York')
+_XML_PARSER = etree.XMLParser(recover=True, resolve_entities=False, no_network=True, huge_tree=True)
+
+
+@dataclass(frozen=True)
+class FeedEntry:
+    title: str
+    link: str
+    updated: datetime | None
+    category: str
+    entry_id: str
+    cik: int | None = None
+    role: str | None = None
+
+    @property
+    def accession(self):
+        """Accession number; shared by the Issuer/Reporting/Filer entries of one filing."""
+        m = _ACCESSION_RE.search(self.entry_id) or _ACCESSION_RE.search(self.link)
+        return m.group(0) if m else self.link
+
+    @property
+    def company(self):
+        """Party name from the title: '8-K - Apple Inc. (0000320193) (Filer)' -> 'Apple Inc.'"""
+        parts = self.title.split(' - ', 1)
+        if len(parts) > 1:
+            return re.sub(r'\s*\(\d+\)\s*\(.*?\)\s*$', '', parts[1]).strip()
+        return self.title.strip() or "Unknown"
+
+
+@dataclass(frozen=True)
+class Form4Transaction:
+    code: str
+    shares: float
+    price: float
+    shares_after: float
+
+    @property
+    def total_value(self):
+        return self.shares * self.price
+
+    @property
+    def is_open_market(self):
+        """Open-market purchase (P) or sale (S); grants, exercises, gifts etc. are not signals."""
+        return self.code in ('P', 'S')
+
+    @property
+    def intent(self):
+        """'new_position' for a buy that is the whole holding, 'exit' for a sale to zero, else ''."""
+        if self.code == 'P' and self.shares == self.shares_after and self.shares > 0:
+            return 'new_position'
+        if self.code == 'S' and self.shares_after == 0:
+            return 'exit'
+        return ''
+
+
+@dataclass(frozen=True)
+class Form4:
+    issuer_name: str
+    issuer_cik: str
+    ticker: str
+    reporter_name: str
+    transactions: list[Form4Transaction] = field(default_factory=list)
+
+    @property
+    def open_market_trades(self):
+        return [t for t in self.transactions if t.is_open_market]
+
+
+@dataclass(frozen=True)
+class Form144:
+    issuer_name: str
+    issuer_cik: str
+    ticker: str
+
+
+@dataclass(frozen=True)
+class Schedule13:
+    subject_name: str
+    subject_cik: str
+    filer_name: str
+    filer_cik: str = ""
+
+
+@dataclass(frozen=True)
+class Form8K:
+    items: dict = field(default_factory=dict)  # "2.02" -> section text, in filing order
+    press_release: str = ""                    # EX-99.1 text
+
+    @property
+    def is_administrative(self):
+        """Only exhibit-list style items (e.g. 9.01 alone): nothing for an analyst to read."""
+        return bool(self.items) and set(self.items) <= ADMIN_8K_ITEMS and not self.press_release
+
+    def prompt_text(self, max_item_chars=4000, max_release_chars=6000):
+        parts = [f"Item {num}: {text[:max_item_chars]}" for num, text in self.items.items() if num not in ADMIN_8K_ITEMS]
+        if self.press_release:
+            parts.append(f"EX-99.1 press release: {self.press_release[:max_release_chars]}")
+        return "\n\n".join(parts)
+
+
+# 8-K items that never carry a business event on their own
+ADMIN_8K_ITEMS = {"9.01"}
+# Form 144 issuer name when nothing in the filing or feed title names it (shown in alerts as is)
+UNKNOWN_ISSUER = "未知公司"
+
+_DOCUMENT_RE = re.compile(r'<DOCUMENT>(.*?)(?:</DOCUMENT>|\Z)', re.DOTALL)
+_ITEM_RE = re.compile(r'\bItem\s*(\d{1,2}\.\d{2})\b\.?', re.IGNORECASE)
+_UUENCODE_RE = re.compile(r'^begin \d{3} .*?^end$', re.DOTALL | re.MULTILINE)
+_HIDDEN_TAGS = {'script', 'style', 'head', 'title', 'ix:header'}
+_BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+
+def _to_bytes(content):
+    return content.encode('utf-8') if isinstance(content, str) else content
+
+
+def _parse_time(text):
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+def parse_atom(content):
+    """EDGAR getcurrent Atom feed -> [FeedEntry], in feed order (newest first)."""
+    root = etree.fromstring(_to_bytes(content), _XML_PARSER)
+    if root is None:
+        return []
+    entries = []
+    for e in root.iterfind(f'{ATOM_NS}entry'):
+        link = e.find(f'{ATOM_NS}link')
+        category = e.find(f'{ATOM_NS}category')
+        title = e.findtext(f'{ATOM_NS}title') or ""
+        cik, role = parse_title_cik(title)
+        entries.append(FeedEntry(
+            title=title,
+            link=link.get('href', '') if link is not None else "",
+            updated=_parse_time(e.findtext(f'{ATOM_NS}updated') or ""),
+            category=category.get('term', '') if category is not None else "",
+            entry_id=e.findtext(f'{ATOM_NS}id') or "",
+            cik=cik,
+            role=role,
+        ))
+    return entries
+
+
+def extract_xml_section(txt, root_tag):
+    """Slice `<root_tag ...>...</root_tag>` out of a full submission .txt as bytes, or None."""
+    raw = _to_bytes(txt)
+    start = raw.find(b'<' + root_tag.encode())
+    if start < 0:
+        return None
+    close = b'</' + root_tag.encode() + b'>'
+    end = raw.find(close, start)
+    if end < 0:
+        return None
+    return raw[start:end + len(close)]
+
+
+def _text(node, path, default):
+    v = node.findtext(path)
+    return v.strip() if v is not None and v.strip() else default
+
+
+def _float(node, path, default):
+    try:
+        return float(node.findtext(path))
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_form4(txt):
+    """Full Form 4 submission .txt -> Form4, parsing only the embedded <ownershipDocument>."""
+    section = extract_xml_section(txt, 'ownershipDocument')
+    if section is None:
+        return None
+    doc = etree.fromstring(section, _XML_PARSER)
+    if doc is None:
+        return None
+    transactions = []
+    for txn in doc.iterfind('.//nonDerivativeTransaction'):
+        transactions.append(Form4Transaction(
+            code=_text(txn, './/transactionCoding/transactionCode', ""),
+            shares=_float(txn, './/transactionShares/value', 0.0),
+            price=_float(txn, './/transactionPricePerShare/value', 0.0),
+            shares_after=_float(txn, './/sharesOwnedFollowingTransaction/value', -1.0),
+        ))
+    return Form4(
+        issuer_name=_text(doc, './/issuerName', "Unknown"),
+        issuer_cik=_text(doc, './/issuerCik', ""),
+        ticker=_text(doc, './/issuerTradingSymbol', "N/A").upper(),
+        reporter_name=_text(doc, './/rptOwnerName', "Unknown"),
+        transactions=transactions,
+    )
+
+
+def unique_filings(entries, prefer_role=None):
+    """One entry per accession (the feed lists a filing once per party, each with its own link),
+    keeping feed order and preferring the `prefer_role` entry, e.g. 'Issuer' or 'Subject'."""
+    out = {}
+    for e in entries:
+        cur = out.get(e.accession)
+        if cur is None or (prefer_role and e.role == prefer_role and cur.role != prefer_role):
+            out[e.accession] = e
+    return list(out.values())
+
+
+def header_party(txt, section):
+    """(conformed name, CIK) of one party block of the SEC header, e.g. 'SUBJECT COMPANY' or
+    'FILER'; either may be None. Accepts the .txt form ('SUBJECT COMPANY: ... COMPANY CONFORMED
+    NAME:') and the .hdr.sgml tag form (<SUBJECT-COMPANY> ... <CONFORMED-NAME>)."""
+    start = rf'(?:<{section.replace(" ", "-")}>|{section}:)'
+    name = re.search(start + r'.*?(?:<CONFORMED-NAME>|COMPANY CONFORMED NAME:)\s*([^\n]+)', txt, re.DOTALL)
+    cik = re.search(start + r'.*?(?:<CIK>|CENTRAL INDEX KEY:)\s*(\d+)', txt, re.DOTALL)
+    return (name.group(1).strip() if name else None), (cik.group(1) if cik else None)
+
+
+def filing_ticker(txt):
+    """Trading symbol stated in a submission (XML symbol tag, else a header 'TICKER SYMBOL:'), or "N/A"."""
+    m = re.search(r'<(?:issuerTradingSymbol|tradingSymbol)>\s*([^<]+?)\s*</', txt, re.IGNORECASE)
+    if m:
+        return m.group(1).strip().upper()
+    m = re.search(r'TICKER SYMBOL:\s*([^\n\r]+)', txt[:5000])
+    if m:
+        return m.group(1).strip().upper()
+    return "N/A"
+
+
+def acceptance_time(txt):
+    """EDGAR acceptance timestamp of a submission (header stamps are US/Eastern) as UTC, or None."""
+    m = re.search(r'<ACCEPTANCE-DATETIME>\s*(\d{14})', txt[:5000])
+    if not m:
+        return None
+    return datetime.strptime(m.group(1), '%Y%m%d%H%M%S').replace(tzinfo=_EDGAR_TZ).astimezone(timezone.utc)
+
+
+def parse_form144(txt, title=""):
+    """Form 144 submission .txt -> Form144. The issuer comes from the primary XML document when
+    present, else from the SEC header, else from the feed `title`; ticker stays "N/A" when the
+    filing carries no symbol (resolve it from issuer_cik / issuer_name). An issuer that cannot
+    be named at all is UNKNOWN_ISSUER."""
+    ticker, issuer_name, issuer_cik = "N/A", None, ""
+
+    sym = re.search(r'<(?:issuerSymbol|issuerTradingSymbol)>\s*([^<]+?)\s*</(?:issuerSymbol|issuerTradingSymbol)>', txt, re.IGNORECASE)
+    if sym:
+        ticker = sym.group(1).strip().upper()
+    nm = re.search(r'<(?:nameOfIssuer|issuerName)>\s*([^<]+?)\s*</(?:nameOfIssuer|issuerName)>', txt, re.IGNORECASE)
+    if nm:
+        issuer_name = nm.group(1).strip()
+
+    sgml = re.search(r'(?:SUBJECT COMPANY|ISSUER)[:\s]*(.*?)(?:FILED BY:|REPORTING-OWNER:|<SEC-DOCUMENT>|</SEC-HEADER>|\Z)', txt[:5000], re.DOTALL | re.IGNORECASE)
+    if sgml:
+        block = sgml.group(1)
+        cn = re.search(r'COMPANY CONFORMED NAME:\s*([^\n\r]+)', block)
+        if cn and issuer_name is None:
+            issuer_name = cn.group(1).strip()
+        ck = re.search(r'CENTRAL INDEX KEY:\s*(\d+)', block)
+        if ck:
+            issuer_cik = ck.group(1)
+
+    if not issuer_cik:
+        cm = re.search(r'\((\d+)\)\s*\(Subject\)', title)
+        if cm:
+            issuer_cik = cm.group(1)
+    if issuer_name is None:
+        tn = re.search(r'144\s*-\s*(.+?)\s*\(\d+\)', title)
+        if tn:
+            issuer_name = tn.group(1).strip()
+    if issuer_name is None:
+        alt = re.search(r'COMPANY CONFORMED NAME:\s*([^\n\r]+)', txt[:5000])
+        if alt:
+            issuer_name = alt.group(1).strip()
+    return Form144(issuer_name=issuer_name or UNKNOWN_ISSUER, issuer_cik=issuer_cik, ticker=ticker)
+
+
+def parse_schedule13(txt):
+    """SC 13D/G submission header -> Schedule13 (subject company and the filing institution)."""
+    subject_name, subject_cik = header_party(txt, 'SUBJECT COMPANY')
+    filer_name, filer_cik = header_party(txt, 'FILED BY')
+    return Schedule13(
+        subject_name=subject_name or "Unknown Target",
+        subject_cik=subject_cik or "",
+        filer_name=filer_name or "Unknown Filer",
+        filer_cik=filer_cik or "",
+    )
+
+
+def submission_documents(txt):
+    """[(type, body text)] for each <DOCUMENT> of a submission .txt, in order. A truncated
+    last document (streamed download cut short) is returned as far as it goes."""
+    docs = []
+    for m in _DOCUMENT_RE.finditer(txt):
+        block = m.group(1)
+        t = re.search(r'<TYPE>([^\n<]+)', block)
+        body = re.search(r'<TEXT>(.*?)(?:</TEXT>|\Z)', block, re.DOTALL)
+        docs.append(((t.group(1).strip().upper() if t else ""), body.group(1) if body else ""))
+    return docs
+
+
+def document_text(body):
+    """Readable text of one document body: HTML/iXBRL markup and hidden XBRL headers dropped,
+    uuencoded payloads removed, whitespace collapsed."""
+    body = _UUENCODE_RE.sub(' ', body)
+    if re.search(r'<(?:html|body|div|p|table)\b', body[:5000], re.IGNORECASE):
+        try:
+            doc = lxml_html.fromstring(body)
+            for el in list(doc.iter()):
+                tag = el.tag if isinstance(el.tag, str) else ''
+                if tag.lower() in _HIDDEN_TAGS or 'display:none' in (el.get('style') or '').replace(' ', '').lower():
+                    el.drop_tree()
+                elif tag.lower() in _BLOCK_TAGS:
+                    el.tail = '\n' + (el.tail or '')
+                elif tag.lower() in ('td', 'th'):
+                    el.tail = ' ' + (el.tail or '')
+            body = doc.text_content()
+        except Exception:
+            body = re.sub(r'<[^>]+>', ' ', body)
+    body = body.replace('\xa0', ' ')
+    body = re.sub(r'[ \t\r\f\v]+', ' ', body)
+    return re.sub(r'\s*\n\s*', '\n', body).strip()
+
+
+def parse_8k(txt):
+    """8-K submission .txt -> Form8K: the `Item x.xx` sections of the primary document plus the
+    EX-99.1 press release, with signatures, exhibits indexes, XBRL and graphics left out."""
+    items, release = {}, ""
+    for doc_type, body in submission_documents(txt):
+        if doc_type.startswith('8-K') and not items:
+            text = document_text(body)
+            sig = re.search(r'\n\s*SIGNATURES?\s*\n', text)
+            if sig:
+                text = text[:sig.start()]
+            marks = list(_ITEM_RE.finditer(text))
+            for i, m in enumerate(marks):
+                end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+                section = text[m.end():end].lstrip(' .:\n').rstrip()
+                num = m.group(1)
+                # The longest occurrence wins (skips cover-page / cross-reference mentions)
+                if len(section) > len(items.get(num, "")):
+                    items[num] = section
+        elif doc_type == 'EX-99.1' and not release:
+            release = document_text(body)
+    return Form8K(items=items, press_release=release)
@@ -1,21 +1,22 @@
+import atexit
 import os
-import requests
+import threading
+import time
 
-SUPABASE_URL = os.environ.get('SUPABASE_URL')
-SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
+from utils.postgrest import get_client
+
+TABLE = "whale_alerts"
+BUFFER_ROWS = int(os.environ.get('SUPABASE_BUFFER_ROWS', 200))
+BUFFER_SECONDS = float(os.environ.get('SUPABASE_BUFFER_SECONDS', 30))
 
 
 def supabase_insert(data):
-    if not SUPABASE_URL or not SUPABASE_KEY:
+    db = get_client()
+    if not db:
         return False
     try:
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=minimal"
-        }
-        resp = requests.post(f"{SUPABASE_URL}/rest/v1/whale_alerts", headers=headers, json=data)
+        # sec_link is unique, so a retried insert cannot duplicate the row (it comes back 409)
+        resp = db.insert(TABLE, data, retry=True)
         if resp.status_code == 201:
             return True
         elif resp.status_code == 409:
@@ -29,61 +30,161 @@ def supabase_insert(data):
         return False
 
 
-def supabase_link_exists(link):
-    if not SUPABASE_URL or not SUPABASE_KEY:
+_claim_rpc = True  # flips off when the claim_alert migration has not been applied
+
+
+def supabase_claim(data, cooldown_minutes=0):
+    """Atomic dedup + insert through the claim_alert RPC (migrations/001_claim_alert.sql): True
+    only when this call inserted the row, i.e. the sec_link was new and, with `cooldown_minutes`,
+    the same source+ticker was not alerted within that window. One round trip instead of
+    exists-check, cooldown-check and insert. Without the RPC it falls back to a (non-atomic)
+    supabase_recent_tickers cooldown check plus supabase_insert."""
+    global _claim_rpc
+    db = get_client()
+    if not db:
         return False
-    try:
-        headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-        resp = requests.get(
-            f"{SUPABASE_URL}/rest/v1/whale_alerts",
-            headers=headers,
-            params={"sec_link": f"eq.{link}", "select": "id", "limit": 1}
-        )
-        return resp.status_code == 200 and len(resp.json()) > 0
-    except Exception as e:
-        print(f"  ⚠️ Supabase 查詢錯誤: {e}")
+    if _claim_rpc:
+        try:
+            # Not retried: if the first attempt committed but its response was lost, a retry would
+            # come back false and the alert this call won would never be sent
+            resp = db.rpc("claim_alert", {"alert": data, "cooldown_minutes": cooldown_minutes})
+            if resp.status_code == 200:
+                return resp.json() is True
+            if resp.status_code == 404:
+                print("🚨 claim_alert RPC 未部署：去重 / 冷卻改為非原子的查詢 + 寫入，"
+                      "多個實例可能重複推送（請執行 migrations/001_claim_alert.sql）")
+                _claim_rpc = False
+            else:
+                print(f"  ⚠️ Supabase claim 失敗: {resp.status_code} - {resp.text[:200]}")
+                return False
+        except Exception as e:
+            print(f"  ⚠️ Supabase claim 錯誤: {e}")
+            return False
+    if cooldown_minutes and data.get("ticker") in supabase_recent_tickers(data.get("source"), cooldown_minutes):
+        print(f"  ⏭️ {data.get('ticker')} 仍在 {cooldown_minutes} 分鐘冷卻期，已跳過")
         return False
+    return supabase_insert(data)
 
 
-def supabase_ticker_recent(source, ticker, minutes=60):
-    """Check if we already alerted on this ticker+source within the last N minutes."""
-    if not SUPABASE_URL or not SUPABASE_KEY or ticker == "N/A":
-        return False
+def supabase_insert_many(rows, chunk=500):
+    """Bulk insert: PostgREST array POSTs of up to `chunk` rows, existing sec_links skipped
+    (resolution=ignore-duplicates), so replays and retries are harmless. Returns how many rows
+    were sent without error. Rows are grouped by column set: an array insert needs the same
+    keys in every row, and padding with nulls would override column defaults (id, created_at)."""
+    db = get_client()
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    if not db or not groups:
+        return 0
+    written = 0
+    for group in groups.values():
+        for i in range(0, len(group), chunk):
+            batch = group[i:i + chunk]
+            try:
+                resp = db.insert(TABLE, batch, params={"on_conflict": "sec_link"},
+                                 prefer="resolution=ignore-duplicates,return=minimal", timeout=30, retry=True)
+                if resp.status_code in (200, 201):
+                    written += len(batch)
+                else:
+                    print(f"  ⚠️ Supabase 批量寫入失敗: {resp.status_code} - {resp.text[:200]}")
+            except Exception as e:
+                print(f"  ⚠️ Supabase 批量寫入錯誤: {e}")
+    return written
+
+
+class AlertBuffer:
+    """Collects whale_alerts rows during a run and writes them with supabase_insert_many once
+    `max_rows` are queued or the oldest has waited `max_age` seconds (checked on add), on
+    flush() and at exit. For rows nothing waits on: audit rows, rows recorded after sending."""
+
+    def __init__(self, max_rows=BUFFER_ROWS, max_age=BUFFER_SECONDS):
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.written = 0
+        self._rows = []
+        self._since = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def add(self, row):
+        with self._lock:
+            if not self._rows:
+                self._since = time.monotonic()
+            self._rows.append(row)
+            due = len(self._rows) >= self.max_rows or (
+                self.max_age is not None and time.monotonic() - self._since >= self.max_age)
+        if due:
+            self.flush()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def flush(self):
+        """Write everything queued; returns how many rows were written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows or not get_client():
+            return 0
+        written = supabase_insert_many(rows)
+        self.written += written
+        print(f"  💾 Supabase 批量寫入 {written}/{len(rows)} 條")
+        return written
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def supabase_buffer(data):
+    """Queue a row on the process-wide AlertBuffer instead of POSTing it now."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = AlertBuffer()
+    _buffer.add(data)
+
+
+def supabase_flush():
+    """Write out the process-wide buffer (end of a daemon cycle); 0 when nothing is queued."""
+    return _buffer.flush() if _buffer is not None else 0
+
+
+def _in_list(values):
+    """PostgREST in.() operand with every value double-quoted (links contain ':' '/' '.')."""
+    return "in.(" + ",".join('"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in values) + ")"
+
+
+def supabase_existing_links(links, chunk=50):
+    """Which of `links` are already in whale_alerts: one sec_link=in.(...) query per `chunk` links."""
+    links = list(dict.fromkeys(links))
+    db = get_client()
+    if not db or not links:
+        return set()
+    found = set()
+    for i in range(0, len(links), chunk):
+        try:
+            resp = db.select(TABLE, {"sec_link": _in_list(links[i:i + chunk]), "select": "sec_link"})
+            if resp.status_code == 200:
+                found.update(row["sec_link"] for row in resp.json())
+            else:
+                print(f"  ⚠️ Supabase 批量查詢失敗: {resp.status_code} - {resp.text[:200]}")
+        except Exception as e:
+            print(f"  ⚠️ Supabase 批量查詢錯誤: {e}")
+    return found
+
+
+def supabase_recent_tickers(source, minutes=60):
+    """All tickers alerted for `source` within the last N minutes, in one query."""
+    db = get_client()
+    if not db:
+        return set()
     try:
         from datetime import datetime, timezone, timedelta
         cutoff = (datetime.now(timezone.utc) - timedelta(minutes=minutes)).isoformat()
-        headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-        resp = requests.get(
-            f"{SUPABASE_URL}/rest/v1/whale_alerts",
-            headers=headers,
-            params={
-                "source": f"eq.{source}",
-                "ticker": f"eq.{ticker}",
-                "created_at": f"gte.{cutoff}",
-                "select": "id",
-                "limit": 1
-            }
-        )
-        return resp.status_code == 200 and len(resp.json()) > 0
+        resp = db.select(TABLE, {"source": f"eq.{source}", "created_at": f"gte.{cutoff}", "select": "ticker"})
+        if resp.status_code == 200:
+            return {row["ticker"] for row in resp.json() if row.get("ticker")}
     except Exception as e:
         print(f"  ⚠️ Supabase ticker 查詢錯誤: {e}")
-        return False
-
-
-def supabase_patch(link, data):
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        return
-    try:
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json"
-        }
-        requests.patch(
-            f"{SUPABASE_URL}/rest/v1/whale_alerts",
-            headers=headers,
-            params={"sec_link": f"eq.{link}"},
-            json=data
-        )
-    except Exception as e:
-        print(f"  ⚠️ Supabase patch 錯誤: {e}")
+    return set()
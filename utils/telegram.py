@@ -1,36 +1,159 @@
+import atexit
 import os
+import queue
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import exceptions as urllib3_exceptions
+
+from utils import metrics
 
 BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
 CHAT_ID_WHALE = os.environ.get('TELEGRAM_CHAT_ID_WHALE')
 CHAT_ID_TEST = os.environ.get('TELEGRAM_CHAT_ID_TEST')
 
+TELEGRAM_TIMEOUT = 20
+MAX_ATTEMPTS = 5
+# Telegram limits: ~1 msg/s per private chat, 20 msgs/min per group or channel
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+_queue = queue.Queue()
+_next_at = {}  # chat_id -> monotonic time the chat may receive its next message
+_worker = None
+_worker_lock = threading.Lock()
+
+
+# urllib3 < 2 has no NameResolutionError: match the resolver message instead
+_NameResolutionError = getattr(urllib3_exceptions, 'NameResolutionError', ())
+_DNS_ERRORS = ("Failed to resolve", "Name or service not known", "nodename nor servname")
+
+
+def _retryable(exc):
+    """Timeouts and dropped connections may clear up; a host that does not resolve won't."""
+    if not isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return False
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    if _NameResolutionError and isinstance(reason, _NameResolutionError):
+        return False
+    return not any(m in str(exc) for m in _DNS_ERRORS)
+
+
+def _chat_interval(chat_id):
+    # Group / supergroup / channel ids are negative
+    return GROUP_CHAT_INTERVAL if str(chat_id).startswith('-') else PRIVATE_CHAT_INTERVAL
+
+
+def _deliver(job):
+    """Send one queued job, pacing its chat and honouring 429 retry_after. True on success.
+
+    Only 429, 5xx and timeouts / dropped connections are retried; a bad token (401/404), bad
+    chat_id (400) or unresolvable host drops the message at once instead of stalling the queue."""
+    method, data, files, label, on_sent = job
+    chat_id = data['chat_id']
+    if not BOT_TOKEN or not chat_id:
+        print(f"❌ Telegram {label} dropped: TELEGRAM_BOT_TOKEN / chat id not set")
+        return False
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        wait = _next_at.get(chat_id, 0) - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            with metrics.stage("telegram"):
+                resp = _session.post(f"https://api.telegram.org/bot{BOT_TOKEN}/{method}",
+                                     data=data, files=files, timeout=TELEGRAM_TIMEOUT)
+        except Exception as e:
+            if not _retryable(e):
+                print(f"❌ Telegram {label} failed: {e}")
+                return False
+            print(f"⚠️ Telegram {label} error (attempt {attempt}): {e}")
+            time.sleep(min(2 ** attempt, 30))
+            continue
+        _next_at[chat_id] = time.monotonic() + _chat_interval(chat_id)
+        if resp.status_code == 200:
+            if on_sent:
+                on_sent()
+            return True
+        if resp.status_code == 429:
+            try:
+                retry_after = resp.json().get('parameters', {}).get('retry_after', 5)
+            except ValueError:
+                retry_after = 5
+            print(f"⏳ Telegram rate limited, retrying {label} in {retry_after}s")
+            _next_at[chat_id] = time.monotonic() + retry_after
+            continue
+        if resp.status_code >= 500:
+            time.sleep(min(2 ** attempt, 30))
+            continue
+        print(f"❌ Telegram {label} failed: {resp.status_code} {resp.text[:200]}")
+        return False
+    print(f"❌ Telegram {label} dropped after {MAX_ATTEMPTS} attempts")
+    return False
+
+
+def _run():
+    while True:
+        deliver, job = _queue.get()
+        try:
+            deliver(job)
+        except Exception as e:
+            print(f"⚠️ Telegram worker error: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _enqueue(method, data, files=None, label="message", on_sent=None):
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="telegram-sender", daemon=True)
+            _worker.start()
+    metrics.count("telegram_queued")
+    # Delivered in the enqueuing engine's run context: send time lands in its "telegram" stage
+    # while the run is still open (a send still queued when the run is written is not counted)
+    _queue.put((metrics.propagate(_deliver), (method, data, files, label, on_sent)))
+
+
+def flush(timeout=None):
+    """Block until every queued message has been delivered (or dropped). False on timeout."""
+    if _worker is None:
+        return True
+    if timeout is None:
+        _queue.join()
+        return True
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+# Scripts exit right after their last alert: drain the queue first
+atexit.register(flush)
+
 
-def send_whale_telegram(message):
-    requests.get(
-        f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
-        params={'chat_id': CHAT_ID_WHALE, 'text': message, 'parse_mode': 'HTML'}
-    )
+def send_whale_telegram(message, on_sent=None):
+    _enqueue('sendMessage', {'chat_id': CHAT_ID_WHALE, 'text': message, 'parse_mode': 'HTML'},
+             label="alert", on_sent=on_sent)
 
 
-def send_telegram_photo(caption, photo_path):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto"
-    with open(photo_path, 'rb') as photo:
-        requests.post(
-            url,
-            data={'chat_id': CHAT_ID_WHALE, 'caption': caption, 'parse_mode': 'HTML'},
-            files={'photo': photo}
-        )
+def send_telegram_photo(caption, photo, on_sent=None):
+    """`photo` is a file path, raw PNG bytes or a file-like object (e.g. an in-memory chart)."""
+    if isinstance(photo, str):
+        with open(photo, 'rb') as f:
+            photo = f.read()
+    elif hasattr(photo, 'read'):
+        photo = photo.read()
+    _enqueue('sendPhoto', {'chat_id': CHAT_ID_WHALE, 'caption': caption, 'parse_mode': 'HTML'},
+             files={'photo': ('chart.png', photo, 'image/png')}, label="photo", on_sent=on_sent)
 
 
 def send_test_telegram(message):
     if not CHAT_ID_TEST:
         return
-    resp = requests.get(
-        f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
-        params={'chat_id': CHAT_ID_TEST, 'text': message}
-    )
-    if resp.status_code == 200:
-        print("📡 Heartbeat sent")
-    else:
-        print(f"❌ Heartbeat failed: {resp.status_code}")
+    _enqueue('sendMessage', {'chat_id': CHAT_ID_TEST, 'text': message},
+             label="heartbeat", on_sent=lambda: print("📡 Heartbeat sent"))
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+import requests
+from bs4 import BeautifulSoup
+
+from utils.cache import cache_path, atomic_write
+from utils import sec_index
+
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+SP500_FILE = cache_path('sp500.json')
+SP500_TTL = float(os.environ.get('SP500_TTL_HOURS', 24)) * 3600
+
+
+class Watchlist:
+    """Frozen ticker + CIK membership sets; lookups are O(1) and never touch the network."""
+
+    def __init__(self, tickers=(), ciks=(), fetched_at=0.0):
+        self.tickers = frozenset(tickers)
+        self.ciks = frozenset(ciks)
+        self.fetched_at = fetched_at
+
+    def __bool__(self):
+        return bool(self.tickers)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def has_ticker(self, ticker):
+        return ticker in self.tickers
+
+    def has_cik(self, cik):
+        try:
+            return int(cik) in self.ciks
+        except (TypeError, ValueError):
+            return False
+
+
+def _scrape_sp500():
+    resp = requests.get(SP500_URL, headers={'User-Agent': 'Mozilla/5.0'}, timeout=15)
+    resp.raise_for_status()
+    soup = BeautifulSoup(resp.text, 'html.parser')
+    rows = soup.find('table', {'id': 'constituents'}).find_all('tr')
+    header = [th.text.strip().upper() for th in rows[0].find_all('th')]
+    sym_col = header.index('SYMBOL') if 'SYMBOL' in header else 0
+    cik_col = header.index('CIK') if 'CIK' in header else None
+
+    tickers, ciks = set(), set()
+    for row in rows[1:]:
+        cells = row.find_all('td')
+        if len(cells) <= sym_col:
+            continue
+        t = cells[sym_col].text.strip()
+        tickers.add(t)
+        tickers.add(t.replace('.', '-'))
+        cik = None
+        if cik_col is not None and len(cells) > cik_col and cells[cik_col].text.strip().isdigit():
+            cik = int(cells[cik_col].text.strip())
+        if cik is None:
+            cik = sec_index.load().cik_for_ticker(t)
+        if cik is not None:
+            ciks.add(cik)
+    return tickers, ciks
+
+
+def _read_disk():
+    try:
+        with open(SP500_FILE) as f:
+            d = json.load(f)
+        return Watchlist(d['tickers'], d['ciks'], d.get('fetched_at', 0.0))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ S&P 500 cache unreadable: {e}")
+        return None
+
+
+_sp500 = None
+_lock = threading.Lock()
+
+
+def load_sp500():
+    """S&P 500 members, re-scraped at most once per SP500_TTL_HOURS.
+    A failed scrape falls back to the last good list on disk."""
+    global _sp500
+    with _lock:
+        if _sp500 is not None and time.time() - _sp500.fetched_at <= SP500_TTL:
+            return _sp500
+        cached = _read_disk()
+        if cached is not None and time.time() - cached.fetched_at <= SP500_TTL:
+            _sp500 = cached
+            return _sp500
+        try:
+            tickers, ciks = _scrape_sp500()
+            if len(tickers) < 400:
+                raise ValueError(f"only {len(tickers)} tickers parsed")
+            _sp500 = Watchlist(tickers, ciks, time.time())
+            atomic_write(SP500_FILE, json.dumps({
+                "fetched_at": _sp500.fetched_at,
+                "tickers": sorted(_sp500.tickers),
+                "ciks": sorted(_sp500.ciks),
+            }).encode())
+            print(f"Refreshed S&P 500 watchlist: {len(ciks)} companies")
+        except Exception as e:
+            print(f"⚠️ S&P 500 list failed: {e}")
+            if cached is not None:
+                age_h = (time.time() - cached.fetched_at) / 3600
+                print(f"  Using last good S&P 500 list ({age_h:.0f}h old)")
+                _sp500 = cached
+            else:
+                print("  ⚠️ No cached S&P 500 list: watchlist filtering is OFF this run")
+                _sp500 = Watchlist()
+        return _sp500
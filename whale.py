@@ -2,188 +2,151 @@
 # 引擎一：Form 4 大鯨魚警報
 # 升級：Supabase + Finnhub + 新版 Gemini SDK + 防重複
 # ================================================================
-import requests
-from bs4 import BeautifulSoup
-import time
-from datetime import datetime, timezone, timedelta
-import os
-import yfinance as yf
-import mplfinance as mpf
-import pandas as pd
+from datetime import datetime, timezone
 import json
-
-from utils.supabase import supabase_insert, supabase_link_exists
+from functools import partial
+
+from utils.edgar import fetch_filings
+from utils.feed import FeedCursor, drain, read_feed, log_alert_latency
+from utils.sec_parse import parse_form4, unique_filings
+from utils import metrics, sec_index, ohlc
+from utils.watchlist import load_sp500
+from utils.supabase import supabase_claim, supabase_existing_links
 from utils.finnhub import get_stock_quote
 from utils.telegram import send_test_telegram, send_telegram_photo, send_whale_telegram
 
 MIN_WHALE_AMOUNT = 500000
+MAX_ALERTS_PER_RUN = 3
+ACTION_LABEL = {'P': "🟢 買入", 'S': "🔴 賣出"}
+INTENT_LABEL = {'new_position': "\n🚀 【強烈看多：首次新建倉！】", 'exit': "\n💀 【強烈看空：已清倉跳船！】"}
 STRICT_WATCHLIST = True
 
+CURSOR = "form4"
+FIRST_RUN_MINUTES = 15
+FETCH_UNTIL = b'</ownershipDocument>'
+FETCH_MAX_BYTES = 1024 * 1024
+
+# Last heartbeat slot sent; the daemon polls far more often than the 5-min cron did
+_last_heartbeat_slot = None
+
+
+def accepts(category):
+    return category in ('4', '4/A')
+
+
+def process(entry, txt, sp500):
+    """Alert on one downloaded Form 4; 1 if an alert went out, 0 if a gate skipped it."""
+    link = entry.link
+    with metrics.stage("parse"):
+        form4 = parse_form4(txt)
+    if form4 is None:
+        return 0
+    issuer_name = form4.issuer_name
+    reporter_name = form4.reporter_name
+    ticker = form4.ticker
+    if ticker in ("N/A", "NONE") and form4.issuer_cik:
+        ticker = sec_index.ticker_for_cik(form4.issuer_cik)
+
+    if STRICT_WATCHLIST and sp500 and not sp500.has_ticker(ticker):
+        metrics.count("skip.watchlist")
+        return 0
+
+    # Open-market buys/sells only; the alert lists every trade above the whale threshold
+    trades = form4.open_market_trades
+    whales = [t for t in trades if t.total_value >= MIN_WHALE_AMOUNT]
+    if not whales:
+        metrics.count("skip.below_threshold")
+        return 0
+    last = trades[-1]
+    action = ACTION_LABEL[last.code]
+    shares, total_value, target_price = last.shares, last.total_value, last.price
+
+    price_str, change_str, current_price, change_pct = get_stock_quote(ticker)
+
+    msg = f"🐋 <b>【頂級大鯨魚警報】</b>\n"
+    msg += f"🏢 {issuer_name} (${ticker})\n"
+    msg += f"👤 {reporter_name}\n"
+    msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
+    for txn in whales:
+        msg += (f"👉 {ACTION_LABEL[txn.code]}: {txn.shares:,.0f} 股\n"
+                f"💰 總額: ${txn.total_value:,.0f} (@${txn.price}){INTENT_LABEL.get(txn.intent, '')}\n")
+    msg += f"🔗 <a href='{link}'>查看 SEC 來源</a>"
+
+    inserted = supabase_claim({
+        "source": "form4",
+        "ticker": ticker,
+        "company_name": issuer_name,
+        "action": action,
+        "reporter_name": reporter_name,
+        "shares": shares,
+        "total_value": total_value,
+        "price": current_price,
+        "change_pct": change_pct,
+        "sec_link": link,
+        "extra_data": json.dumps({"tx_price": target_price})
+    })
+    if not inserted:
+        print(f"    Skipped: already in DB or insert failed")
+        metrics.count("skip.claimed")
+        return 0
 
-def get_sp500_tickers():
     try:
-        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        resp = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        tickers = set()
-        for row in soup.find('table', {'id': 'constituents'}).find_all('tr')[1:]:
-            t = row.find_all('td')[0].text.strip()
-            tickers.add(t)
-            tickers.add(t.replace('.', '-'))
-        return tickers
+        with metrics.stage("chart"):
+            df = ohlc.history(ticker, days=180)
+            chart = None if df.empty else ohlc.render_chart(
+                df, f"{ticker} 6M K-Line (Whale: ${target_price})", hline=target_price)
+        if chart is not None:
+            send_telegram_photo(msg, chart, on_sent=partial(log_alert_latency, entry))
+        else:
+            send_whale_telegram(msg, on_sent=partial(log_alert_latency, entry))
     except Exception as e:
-        print(f"⚠️ S&P 500 list failed: {e}")
-        return set()
+        print(f"Chart error: {e}")
+        send_whale_telegram(msg, on_sent=partial(log_alert_latency, entry))
 
+    return 1
 
-def main():
+
+def handle(window, cursor):
+    """Run the Form 4 pipeline over new feed entries and advance `cursor` past them."""
+    global _last_heartbeat_slot
     now_utc = datetime.now(timezone.utc)
 
-    if now_utc.hour % 3 == 0 and now_utc.minute < 5:
+    slot = (now_utc.date(), now_utc.hour // 3)
+    if now_utc.hour % 3 == 0 and now_utc.minute < 5 and slot != _last_heartbeat_slot:
+        _last_heartbeat_slot = slot
         send_test_telegram(f"✅ V22 Whale Radar online! (UTC {now_utc.strftime('%H:%M')})")
 
-    sp500_tickers = get_sp500_tickers()
-    headers = {'User-Agent': 'WhaleRadarBot Admin@kuafuorhk.com'}
-    url = 'https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=4&owner=only&count=40&output=atom'
-    time_limit = now_utc - timedelta(minutes=15)
-
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.content, 'xml')
-    entries = soup.find_all('entry')
-    print(f"📡 Found {len(entries)} Form 4 entries")
-    found_count = 0
-
-    for entry in entries:
-        link = entry.link['href']
-        updated_str = entry.updated.text
-
-        try:
-            if datetime.fromisoformat(updated_str.replace('Z', '+00:00')).astimezone(timezone.utc) < time_limit:
-                break
-        except Exception:
-            continue
+    sp500 = load_sp500()
+    print(f"📡 Found {len(window)} new Form 4 entries")
 
-        if supabase_link_exists(link):
+    # One filing shows up once per party; the (Issuer) entry carries the company CIK
+    candidates = []
+    for entry in unique_filings(window, prefer_role='Issuer'):
+        issuer_cik = entry.cik if entry.role == 'Issuer' else None
+        # Feed-level watchlist gate: no body download for issuers outside the S&P 500
+        if STRICT_WATCHLIST and sp500.ciks and issuer_cik is not None and not sp500.has_cik(issuer_cik):
+            metrics.count("skip.watchlist")
             continue
+        candidates.append(entry)
 
-        txt_link = link.replace('-index.htm', '.txt')
-        txt_response = requests.get(txt_link, headers=headers)
+    existing = supabase_existing_links(e.link for e in candidates)
+    pending = [e for e in candidates if e.link not in existing]
+    metrics.count("skip.dedup", len(candidates) - len(pending))
+    print(f"  {len(pending)}/{len(window)} feed entries pass the watchlist + dedup gates")
 
-        if txt_response.status_code != 200:
-            continue
+    filings = fetch_filings((e.link for e in pending), until=FETCH_UNTIL, max_bytes=FETCH_MAX_BYTES)
 
-        xml_soup = BeautifulSoup(txt_response.content, 'xml')
-        try:
-            issuer_name = xml_soup.find('issuerName').text if xml_soup.find('issuerName') else "Unknown"
-            reporter_name = xml_soup.find('rptOwnerName').text if xml_soup.find('rptOwnerName') else "Unknown"
-            ticker_tag = xml_soup.find('issuerTradingSymbol')
-            ticker = ticker_tag.text.strip().upper() if ticker_tag else "N/A"
-
-            if STRICT_WATCHLIST and sp500_tickers and (ticker not in sp500_tickers):
-                continue
-
-            transactions = xml_soup.find_all('nonDerivativeTransaction')
-            if not transactions:
-                continue
-
-            price_str, change_str, current_price, change_pct = get_stock_quote(ticker)
-
-            msg = f"🐋 <b>【頂級大鯨魚警報】</b>\n"
-            msg += f"🏢 {issuer_name} (${ticker})\n"
-            msg += f"👤 {reporter_name}\n"
-            msg += f"💲 股價: <b>{price_str}</b>  {change_str}\n"
-            is_whale = False
-            target_price = 0
-            action = ""
-            shares = 0
-            total_value = 0
-
-            for txn in transactions:
-                coding_tag = txn.find('transactionCoding')
-                tx_code = coding_tag.find('transactionCode').text if coding_tag and coding_tag.find('transactionCode') else ""
-                if tx_code not in ['P', 'S']:
-                    continue
-
-                shares_tag = txn.find('transactionShares')
-                shares_str = shares_tag.find('value').text if shares_tag and shares_tag.find('value') else "0"
-                price_tag = txn.find('transactionPricePerShare')
-                price_val_str = price_tag.find('value').text if price_tag and price_tag.find('value') else "0"
-                post_tag = txn.find('sharesOwnedFollowingTransaction')
-                post_str = post_tag.find('value').text if post_tag and post_tag.find('value') else "-1"
-
-                try:
-                    shares = float(shares_str)
-                    price = float(price_val_str)
-                    post_shares = float(post_str)
-                    total_value = shares * price
-                    target_price = price
-                except Exception:
-                    total_value = 0
-                    post_shares = -1
-
-                action = "🟢 買入" if tx_code == 'P' else "🔴 賣出"
-                intent_label = ""
-                if tx_code == 'P' and shares == post_shares and shares > 0:
-                    intent_label = "\n🚀 【強烈看多：首次新建倉！】"
-                elif tx_code == 'S' and post_shares == 0:
-                    intent_label = "\n💀 【強烈看空：已清倉跳船！】"
-
-                if total_value >= MIN_WHALE_AMOUNT:
-                    is_whale = True
-                    msg += f"👉 {action}: {shares:,.0f} 股\n💰 總額: ${total_value:,.0f} (@${price}){intent_label}\n"
-
-            msg += f"🔗 <a href='{link}'>查看 SEC 來源</a>"
-
-            if not is_whale:
-                continue
-
-            inserted = supabase_insert({
-                "source": "form4",
-                "ticker": ticker,
-                "company_name": issuer_name,
-                "action": action,
-                "reporter_name": reporter_name,
-                "shares": shares,
-                "total_value": total_value,
-                "price": current_price,
-                "change_pct": change_pct,
-                "sec_link": link,
-                "extra_data": json.dumps({"tx_price": target_price})
-            })
-            if not inserted:
-                print(f"    Skipped: already in DB or insert failed")
-                continue
-
-            filename = f"{ticker}_chart.png"
-            try:
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=180)
-                df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.droplevel(1)
-                if not df.empty:
-                    mpf.plot(df, type='candle', style='charles',
-                             title=f"{ticker} 6M K-Line (Whale: ${target_price})",
-                             hlines=dict(hlines=[target_price], colors=['r'], linestyle='--'),
-                             savefig=filename)
-                    send_telegram_photo(msg, filename)
-                else:
-                    send_whale_telegram(msg)
-            except Exception as e:
-                print(f"Chart error: {e}")
-                send_whale_telegram(msg)
-            finally:
-                if os.path.exists(filename):
-                    os.remove(filename)
-
-            found_count += 1
-            time.sleep(1.5)
-
-        except Exception as e:
-            print(f"Parse error: {e}")
-
-        if found_count >= 3:
-            break
+    def run(entry):
+        txt = filings.get(entry.link)
+        return None if txt is None else process(entry, txt, sp500)
+
+    return drain(cursor, window, pending, run, MAX_ALERTS_PER_RUN)
+
+
+def main():
+    with metrics.run(CURSOR):
+        cursor = FeedCursor.load(CURSOR)
+        return handle(read_feed('4', 'only', cursor, FIRST_RUN_MINUTES), cursor)
 
 
 if __name__ == "__main__":